@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+
+class BulkResult:
+    def __init__(self, action, accepted, remaining, verified):
+        """
+        The outcome of a bulk operation on a list, which may be partial if
+        its deadline passed or it was cancelled
+        :param action: str: the MailingList method performing the operation
+        :param accepted: list<dict>: the requests accepted by the server
+        :param remaining: list<dict>: the requests not sent, or not accepted
+        :param verified: bool: whether or not the list was refreshed after
+        the requests were sent
+        """
+        self.action = action
+        self.accepted = accepted
+        self.remaining = remaining
+        self.verified = verified
+
+    def __repr__(self):
+        # <BulkResult 'set_subscribers' 120 accepted, 30 remaining>
+        return ("<BulkResult '{}' {} accepted, {} remaining{}>".format(
+            self.action, len(self.accepted), len(self.remaining),
+            "" if self.verified else ", unverified"))
+
+    @property
+    def complete(self):
+        # Every request was accepted, and the list reflects them
+        return (not self.remaining and self.verified)
+
+    def to_record(self):
+        """
+        Flatten this result into plain values, e.g. for JSON
+        :return: dict: the action, accepted and remaining requests, whether
+        or not the list was verified, and whether or not it is complete
+        """
+        return ({'action': self.action,
+                 'accepted': self.accepted,
+                 'remaining': self.remaining,
+                 'verified': self.verified,
+                 'complete': self.complete})
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+from argparse import ArgumentParser
+from getpass import getpass
+from json import dumps
+from os import environ
+from sys import exit
+from sys import stderr
+from time import perf_counter
+
+from Sympal.SubscriberSource import SubscriberSource
+from Sympal.Sympa import Sympa
+from Sympal.SympalClient import SympalClient
+from Sympal.SympalClient import SympalClientError
+from Sympal.SympalDaemon import SympalDaemon
+from Sympal.Transport import RecordingTransport
+from Sympal.Transport import ReplayTransport
+
+
+def daemon(args):
+    # Log in (or resume a stored session), then serve until shut down
+    password = environ.get('admin_pass') or getpass("Sympa password: ")
+    sympa = Sympa(args.url, session_store=args.session,
+                  keep_session=bool(args.session))
+
+    with sympa:
+        sympa.log_in(args.email, password)
+
+        if not sympa.email:
+            exit(1)
+
+        SympalDaemon(sympa, args.socket, args.refresh_mins).serve_forever()
+
+
+def record(args):
+    # Log in and populate all lists, recording every response to a fixture
+    password = environ.get('admin_pass') or getpass("Sympa password: ")
+    transport = RecordingTransport(args.fixture)
+
+    with Sympa(args.url, transport=transport) as sympa:
+        sympa.log_in(args.email, password)
+        sympa.populate_all()
+
+
+def bench(args):
+    # Time populating all lists from a recorded fixture, with no network
+    transport = ReplayTransport(args.fixture)
+    sympa = Sympa(args.url, transport=transport)
+    times = []
+
+    for i in range(args.repeat):
+        transport.rewind()  # Every run parses exactly the same pages
+        start = perf_counter()
+        sympa.populate_all(force=True)
+        times += [perf_counter() - start]
+
+    subscribers = sum(len(l._subscribers) for l in sympa.lists.values())
+    times.sort()
+    print("{} lists, {} subscribers".format(len(sympa.lists), subscribers))
+    print("populate_all: min {:.4f}s, median {:.4f}s, max {:.4f}s".format(
+        times[0], times[len(times) // 2], times[-1]))
+
+
+def print_records(records, as_json):
+    # Print records as JSON lines, or just their email addresses
+    for record in records or []:
+        print(dumps(record) if as_json else record['email'])
+
+
+def report(result):
+    # Print how much of a bulk operation was done, failing if not all of it
+    print("{} accepted, {} remaining{}".format(
+        len(result['accepted']), len(result['remaining']),
+        "" if result['verified'] else ", unverified"))
+
+    if not result['complete']:
+        exit(1)
+
+
+def query(args):
+    # Send a single request to a running daemon, print the result
+    with SympalClient(args.socket) as client:
+        if args.command == 'lists':
+            for name in client.lists():
+                print(name)
+        elif args.command == 'subscribers':
+            print_records(client.subscribers(args.list), args.json)
+        elif args.command == 'bouncing':
+            print_records(client.bouncing(args.list), args.json)
+        elif args.command == 'refresh':
+            client.refresh(args.list)
+        elif args.command == 'set':
+            source = SubscriberSource(args.file, args.columns)
+            report(client.set_subscribers(args.list, source))
+        elif args.command == 'add':
+            client.add_subscriber(args.list, args.email, " ".join(args.name))
+        elif args.command == 'remove':
+            client.remove_subscriber(args.list, args.email)
+        elif args.command == 'reset-bouncing':
+            report(client.reset_bouncing(args.list))
+        elif args.command == 'remove-bouncing':
+            report(client.remove_bouncing_subscribers(args.list))
+        elif args.command == 'stop':
+            client.shutdown()
+
+
+def parser():
+    # Command line arguments for each command
+    p = ArgumentParser(prog='sympal',
+                       description='Sympa list management from a warm daemon')
+    p.add_argument('--socket', default=SympalDaemon.DEFAULT_SOCKET,
+                   help='Unix domain socket of the daemon')
+    commands = p.add_subparsers(dest='command')
+    commands.required = True
+
+    d = commands.add_parser('daemon', help='log in and serve requests')
+    login_arguments(d)
+    d.add_argument('--session', help='file to keep the session in')
+    d.add_argument('--refresh-mins', type=float,
+                   default=SympalDaemon.REFRESH_MINS)
+
+    commands.add_parser('lists', help='names of the lists')
+
+    for name in ['subscribers', 'bouncing']:
+        c = commands.add_parser(name, help='{} of a list'.format(name))
+        c.add_argument('list')
+        c.add_argument('--json', action='store_true',
+                       help='print full records as JSON lines')
+
+    c = commands.add_parser('refresh', help='refresh a list, or all lists')
+    c.add_argument('list', nargs='?')
+
+    c = commands.add_parser('set', help='set the subscribers of a list')
+    c.add_argument('list')
+    c.add_argument('file', help='roster of "email name" lines, or CSV')
+    c.add_argument('--columns', nargs=2, metavar=('EMAIL', 'NAME'),
+                   help='CSV header names of the email and name columns')
+
+    c = commands.add_parser('add', help='add a subscriber to a list')
+    c.add_argument('list')
+    c.add_argument('email')
+    c.add_argument('name', nargs='*')
+
+    c = commands.add_parser('remove', help='remove a subscriber from a list')
+    c.add_argument('list')
+    c.add_argument('email')
+
+    for name in ['reset-bouncing', 'remove-bouncing']:
+        c = commands.add_parser(name, help='{} subscribers'.format(name))
+        c.add_argument('list')
+
+    commands.add_parser('stop', help='stop the daemon')
+
+    c = commands.add_parser('record', help='record all lists to a fixture')
+    login_arguments(c)
+    c.add_argument('fixture', help='fixture file to write (.jsonl.gz)')
+
+    c = commands.add_parser('bench', help='time parsing a recorded fixture')
+    c.add_argument('fixture', help='fixture file written by record')
+    c.add_argument('--url', default=environ.get('sympa_url'),
+                   required='sympa_url' not in environ,
+                   help='the sympa url the fixture was recorded from')
+    c.add_argument('--repeat', type=int, default=5)
+    return (p)
+
+
+def login_arguments(p):
+    # Arguments for commands that log in
+    p.add_argument('--url', default=environ.get('sympa_url'),
+                   required='sympa_url' not in environ)
+    p.add_argument('--email', default=environ.get('admin_email'),
+                   required='admin_email' not in environ)
+
+
+def main(argv=None):
+    """
+    Entry point of the sympal command
+    :param argv: list<str>: command line arguments
+    :return:
+    """
+    args = parser().parse_args(argv)
+
+    local = {'daemon': daemon, 'record': record, 'bench': bench}
+
+    if args.command in local:  # Commands that do not use the daemon
+        local[args.command](args)
+        return
+
+    try:
+        query(args)
+    except (OSError, SympalClientError) as err:
+        print("sympal: {}".format(err), file=stderr)
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+from threading import Event
+from threading import Lock
+from time import monotonic
+from weakref import WeakSet
+
+
+class OperationCancelled(Exception):
+    # Raised when an operation's deadline passes or it is cancelled before a
+    # request could be sent
+    pass
+
+
+class CancellationToken:
+    def __init__(self):
+        """
+        Shared between a caller and the operations it starts; cancelling it
+        makes those operations stop sending requests and return promptly
+        """
+        self._event = Event()
+        self._lock = Lock()
+        self._linked = WeakSet()  # Tokens cancelled along with this one
+
+    def cancel(self):
+        """
+        Cancel every operation using this token, or a token linked to it
+        :return:
+        """
+        with self._lock:
+            self._event.set()
+            linked = list(self._linked)
+
+        for token in linked:
+            token.cancel()
+
+    def link(self, token):
+        """
+        Cancel another token whenever this one is cancelled
+        :param token: CancellationToken: the token to cancel along with this
+        :return:
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._linked.add(token)
+                return
+
+        token.cancel()  # Already cancelled
+
+    @property
+    def cancelled(self):
+        return (self._event.is_set())
+
+    def wait(self, seconds):
+        """
+        Sleep, waking early if cancelled
+        :param seconds: float: how long to sleep
+        :return: bool: whether or not the token was cancelled
+        """
+        return (self._event.wait(seconds))
+
+
+class Deadline:
+    def __init__(self, seconds=None, cancel=None):
+        """
+        A time budget for an operation, optionally with a cancellation token
+        :param seconds: float: seconds from now until the deadline, or None
+        for no deadline
+        :param cancel: CancellationToken: cancels the operation early
+        """
+        self.expires = None if seconds is None else monotonic() + seconds
+        self.cancel = cancel or CancellationToken()
+
+    @classmethod
+    def of(cls, deadline=None, cancel=None):
+        """
+        The Deadline for the deadline and cancel arguments of an operation
+        :param deadline: float or Deadline: seconds, or an existing Deadline
+        :param cancel: CancellationToken: cancels the operation early
+        :return: Deadline: the deadline
+        """
+        if isinstance(deadline, cls):
+            if cancel is None or cancel is deadline.cancel:
+                return (deadline)
+
+            # Both given: the same expiry, cancelled by either token
+            combined = cls()
+            combined.expires = deadline.expires
+            deadline.cancel.link(combined.cancel)
+            cancel.link(combined.cancel)
+            return (combined)
+
+        return (cls(deadline, cancel))
+
+    def remaining(self):
+        """
+        :return: float: seconds until the deadline (at least 0), or None if
+        there is no deadline
+        """
+        if self.expires is None:
+            return (None)
+
+        return (max(0.0, self.expires - monotonic()))
+
+    @property
+    def done(self):
+        # The deadline has passed, or the operation was cancelled
+        return (self.cancel.cancelled or self.remaining() == 0)
+
+    def check(self):
+        """
+        :return:
+        :raises OperationCancelled: if the deadline passed or was cancelled
+        """
+        if self.cancel.cancelled:
+            raise OperationCancelled("Operation cancelled")
+
+        if self.remaining() == 0:
+            raise OperationCancelled("Operation deadline exceeded")
+
+    def timeout(self, default):
+        """
+        The timeout for a request: the default, cut to the time remaining
+        :param default: float: the usual request timeout, in seconds
+        :return: float: the timeout
+        :raises OperationCancelled: if no time remains
+        """
+        self.check()
+        remaining = self.remaining()
+        return (default if remaining is None else min(default, remaining))
+
+    def sleep(self, seconds):
+        """
+        Sleep, but no later than the deadline, waking early if cancelled
+        :param seconds: float: how long to sleep
+        :return: bool: whether or not the deadline passed or was cancelled
+        """
+        remaining = self.remaining()
+
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+
+        self.cancel.wait(seconds)
+        return (self.done)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+
+class EmailNormalizer:
+    # How the names of duplicate addresses are merged
+    MERGE_RULES = ['first', 'last', 'longest']
+
+    def __init__(self, fold_domain=True, fold_local=True, strip=True,
+                 merge='first'):
+        """
+        Canonical forms of email addresses, so that addresses differing only
+        in case or surrounding whitespace are treated as the same subscriber
+        :param fold_domain: bool: lower case the domain (always case
+        insensitive)
+        :param fold_local: bool: lower case the local part (case insensitive
+        on nearly every server, and lower cased by Sympa itself)
+        :param strip: bool: trim surrounding whitespace
+        :param merge: str: which name to keep for duplicate addresses: the
+        'first' or 'last' non-empty one, or the 'longest'
+        """
+        if merge not in self.MERGE_RULES:
+            raise ValueError("Unknown merge rule '{}', expected one of "
+                             "{}".format(merge, self.MERGE_RULES))
+
+        self.fold_domain = fold_domain
+        self.fold_local = fold_local
+        self.strip = strip
+        self.merge = merge
+
+    def normalize(self, email):
+        """
+        :param email: str: an email address
+        :return: str: the canonical form of the address
+        """
+        if self.strip:
+            email = email.strip()
+
+        local, at, domain = email.rpartition('@')
+
+        if not at:  # Not an address, leave the case alone
+            return (domain)
+
+        if self.fold_local:
+            local = local.lower()
+        if self.fold_domain:
+            domain = domain.lower()
+
+        return ('{}@{}'.format(local, domain))
+
+    def merge_names(self, old, new):
+        """
+        Merge the names given for two occurrences of the same address
+        :param old: str: the name kept so far
+        :param new: str: the name of the later occurrence
+        :return: str: the name to keep
+        """
+        if not old or not new:
+            return (old or new)
+
+        if self.merge == 'last':
+            return (new)
+        if self.merge == 'longest' and len(new) > len(old):
+            return (new)
+
+        return (old)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+from collections import deque
+from concurrent.futures import Future
+from threading import Condition
+from threading import Thread
+
+
+class HostScheduler:
+    def __init__(self, max_workers=8, per_host=4):
+        """
+        A shared pool of worker threads for requests to several hosts. Each
+        host has its own queue and concurrency limit, and workers take work
+        from the hosts in turn, so that a long queue for one host does not
+        delay requests for another
+        :param max_workers: int: requests in flight, across all hosts
+        :param per_host: int: default requests in flight to any one host
+        """
+        self.per_host = per_host
+        self.limits = {}  # host: concurrency limit, if not per_host
+        self.queues = {}  # host: deque of (future, func, args, kwargs)
+        self.active = {}  # host: requests in flight
+        self.turn = 0  # Which host is looked at first for the next task
+        self._condition = Condition()
+        self._shutdown = False
+        self.workers = []
+
+        for i in range(max_workers):
+            t = Thread(target=self.__worker)
+            t.daemon = True
+            t.start()
+            self.workers += [t]
+
+    def set_limit(self, host, limit):
+        """
+        Set the concurrency limit of a host
+        :param host: str: the host
+        :param limit: int: requests in flight to the host
+        :return:
+        """
+        with self._condition:
+            self.limits[host] = limit
+            self._condition.notify_all()
+
+    def submit(self, host, func, *args, **kwargs):
+        """
+        Queue a call for a host
+        :param host: str: the host the call makes requests to
+        :param func: function: the call
+        :return: Future: the result of the call
+        """
+        future = Future()
+
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("HostScheduler has been shut down")
+
+            self.queues.setdefault(host, deque()).append((future, func, args,
+                                                          kwargs))
+            self.active.setdefault(host, 0)
+            self._condition.notify()
+
+        return (future)
+
+    def call(self, host, func, *args, **kwargs):
+        """
+        Queue a call for a host, and wait for its result
+        :param host: str: the host the call makes requests to
+        :param func: function: the call
+        :return: obj: the result of the call
+        """
+        return (self.submit(host, func, *args, **kwargs).result())
+
+    def __next_task(self):
+        # Take the next task of the first host, in turn, that has queued tasks
+        # and is under its limit; None if there is no such host
+        hosts = list(self.queues.keys())
+
+        for i in range(len(hosts)):
+            host = hosts[(self.turn + i) % len(hosts)]
+            limit = self.limits.get(host, self.per_host)
+
+            if self.queues[host] and self.active[host] < limit:
+                self.turn = (self.turn + i + 1) % len(hosts)
+                self.active[host] += 1
+                return (host, self.queues[host].popleft())
+
+        return (None)
+
+    def __worker(self):
+        # Run tasks until shut down
+        while True:
+            with self._condition:
+                task = self.__next_task()
+
+                while task is None and not self._shutdown:
+                    self._condition.wait()
+                    task = self.__next_task()
+
+                if task is None:
+                    break
+
+            host, (future, func, args, kwargs) = task
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except BaseException as err:
+                    future.set_exception(err)
+
+            with self._condition:
+                self.active[host] -= 1
+                self._condition.notify_all()
+
+    def shutdown(self, wait=True):
+        """
+        Stop the workers once the queued tasks are done
+        :param wait: bool: wait for the workers to stop
+        :return:
+        """
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+
+        if wait:
+            for t in self.workers:
+                t.join()
@@ -1,16 +1,25 @@
 #!/usr/bin/env python3
 from datetime import datetime
 from datetime import timedelta
-from os.path import isfile
+from itertools import islice
 from queue import Queue
 from sys import stderr
+from threading import RLock
 from threading import Thread
-from time import sleep
+from threading import local
 
 from lxml import etree
 
+from Sympal.BulkResult import BulkResult
+from Sympal.Deadline import Deadline
+from Sympal.Deadline import OperationCancelled
 from Sympal.MailingList_Meta import MailingList_Meta
+from Sympal.OperationJournal import OperationJournal
+from Sympal.SingleFlight import SingleFlight
 from Sympal.Subscriber import Subscriber
+from Sympal.SubscriberIndex import SubscriberIndex
+from Sympal.SubscriberSource import SubscriberSource
+from Sympal.WriteBatch import WriteBatch
 
 
 class MailingList(object, metaclass=MailingList_Meta):
@@ -38,6 +47,11 @@ class MailingList(object, metaclass=MailingList_Meta):
     BOUNCING_XPATH = etree.XPath(('//*[@id="Paint"]/div[4]/form[4]/'
                                   'fieldset/table'))
 
+    # Bulk operations that are verified on the review bouncing page
+    BOUNCING_ACTIONS = ['reset_bouncing']
+    # Most addresses in one consolidated add or delete request of a batch
+    BATCH_CHUNK = 100
+
     # How frequently to update the MailingList instances in minutes
     UPDATE_MINS = 5
     TIMEOUT = 60
@@ -46,8 +60,21 @@ class MailingList(object, metaclass=MailingList_Meta):
     def __init__(self, sympa, name):
         self.sympa = sympa
         self.name = name
+        # Canonical forms of addresses, used as the keys of _subscribers
+        self.normalizer = sympa.normalizer
         self._admin = False
         self._subscribers = {}
+        # Whether the review page has been parsed into _subscribers, which
+        # may be empty, or hold only bouncing subscribers, either way
+        self._loaded = False
+        self._index = SubscriberIndex()  # Secondary indexes of _subscribers
+        # Concurrent refreshes share one fetch and parse, and parsed pages are
+        # applied to _subscribers and _index one at a time
+        self._flight = SingleFlight()
+        self._state_lock = RLock()
+        # The WriteBatch buffering add and remove in each thread, if any --
+        # other threads using the list are not batched
+        self._open_batch = local()
         # URI for subscribers and bouncing, showing up to 10,000 members
         self.review_uri = ('?sortby=email&action='
                            'review&list={}&size=10000').format(self.name)
@@ -56,43 +83,108 @@ class MailingList(object, metaclass=MailingList_Meta):
         self.review = None
         self.review_bouncing = None
         self._last_updated = datetime.now()
+        self._bouncing_updated = datetime.now()
 
     def __repr__(self):
         return ("<MailingList '{}'>".format(self.name))
 
+    def clear(self):
+        """
+        Release the fetched pages and parsed subscribers of this list, so that
+        they are fetched again when next needed
+        :return:
+        """
+        with self._state_lock:
+            self.review = None
+            self.review_bouncing = None
+            self._subscribers = {}
+            self._loaded = False
+            self._index.clear()
+
     def __needs_update(self):
         # If this instance needs to be updated, which is when:
         # It hasn't been updated in the last UPDATE_MINS,
         # There is no subscribers page,
         # There is no bouncing page,
-        # The subscribers list == None (not initialized)
+        # The subscribers have not been loaded from the review page (an empty
+        # list, once loaded, needs no update)
         difference = datetime.now() - self._last_updated
         outdated = (difference > timedelta(minutes=self.UPDATE_MINS))
         update = \
             self.review is None or \
-            not self._subscribers or \
+            not self._loaded or \
             not self.review_bouncing or \
             outdated
         return (update)
 
-    def update(self):
-        # Update this instance if it needs to be updated
-        if self.__needs_update():
-            self.__get_review()  # Update review page
-            self.__get_review_bouncing()  # Update review bouncing page
-            self.__check_admin()  # Update admin privileges
-            self.__update_subscribers()  # Update subscriber list
+    def __needs_bouncing_update(self):
+        # If the bouncing information needs to be updated, which is when there
+        # is no bouncing page, or it has not been updated in UPDATE_MINS
+        difference = datetime.now() - self._bouncing_updated
+        outdated = (difference > timedelta(minutes=self.UPDATE_MINS))
+        return (self.review_bouncing is None or outdated)
+
+    def update_bouncing(self, deadline=None, cancel=None):
+        # Update the bouncing information of this instance if it needs to be
+        # updated, without fetching the review page
+        if self.__needs_bouncing_update():
+            self.refresh_bouncing(deadline, cancel)
 
-    def __update_subscribers(self, wait_for_update=False):
+    def refresh_bouncing(self, deadline=None, cancel=None):
+        """
+        Fetch and parse only the review bouncing page of this list. Does not
+        need the subscribers to have been loaded; bouncing subscribers that
+        are not yet known are added with just their bouncing information
+        :param deadline: float or Deadline: seconds allowed for the refresh
+        :param cancel: CancellationToken: cancels the refresh
+        :return:
+        """
+        deadline = Deadline.of(deadline, cancel)
+        # Callers refreshing at the same time share one refresh
+        self._flight.do('bouncing', lambda: self.__refresh_bouncing(deadline),
+                        deadline)
+
+    def __refresh_bouncing(self, deadline):
+        # Fetch and parse the review bouncing page
+        self.__get_review_bouncing(deadline)
+        self._admin = self.check_admin(self.review_bouncing)
+        self.__update_from_review_bouncing(deadline=deadline)
+
+    def update(self, force=False, deadline=None, cancel=None):
+        # Update this instance if it needs to be updated (or if forced to),
+        # raising OperationCancelled if the deadline passes or is cancelled.
+        # Callers updating at the same time share one fetch and parse
+        if force or self.__needs_update():
+            deadline = Deadline.of(deadline, cancel)
+            self._flight.do('update', lambda: self.__refresh(deadline),
+                            deadline)
+
+    def __refresh(self, deadline):
+        # Fetch both review pages, then parse them
+        self.__get_review(deadline)  # Update review page
+        self.__get_review_bouncing(deadline)  # Update review bouncing page
+        self.__check_admin()  # Update admin privileges
+        self.__update_subscribers(deadline=deadline)  # Update subscribers
+
+    def __update_subscribers(self, wait_for_update=False, deadline=None):
         # Get all of the subscribers, populate listed information, then, fill
         # in information obtained from the review bouncing page, set last update
-        self.__update_from_review(wait_for_update)
-        self.__update_from_review_bouncing(wait_for_update)
+        self.__update_from_review(wait_for_update, deadline)
+
+        if wait_for_update:
+            # Membership changes do not show on the review bouncing page, so
+            # fetch it once (for removed subscribers) rather than waiting on it
+            try:
+                self.__get_review_bouncing(deadline)
+            except OperationCancelled:  # Keep the page as last fetched
+                pass
+
+        self.__update_from_review_bouncing(deadline=deadline)
         self._last_updated = datetime.now()
 
-    def check_admin(self):
-        # Check admin privileges
-        page = self.review
+    def check_admin(self, page=None):
+        # Check admin privileges, from the review page unless given a page
+        page = page or self.review
         priv = self.PRIV_XPATH(self.sympa.get_page_root(page))
         if any(x in priv[1] for x in self.PRIV_ROLES):
             return (True)
@@ -103,49 +195,56 @@ class MailingList(object, metaclass=MailingList_Meta):
         # Update stored admin privileges
         self._admin = self.check_admin()
 
-    def __get_review(self):
+    def __get_review(self, deadline=None):
         # Get the review page for this list
-        self.review = self.sympa.get_page(self.review_uri)
+        self.review = self.sympa.get_page(self.review_uri, deadline=deadline)
 
-    def __get_review_bouncing(self):
+    def __get_review_bouncing(self, deadline=None):
         # Get the review bouncing page for this list
-        self.review_bouncing = self.sympa.get_page(self.review_bouncing_uri)
+        self.review_bouncing = self.sympa.get_page(self.review_bouncing_uri,
+                                                   deadline=deadline)
+
+    def __wait_for_change(self, attribute, fetch, deadline=None):
+        # Re-fetch a page (the review or review_bouncing attribute) until its
+        # text changes, for up to TIMEOUT seconds, but never past the deadline
+        page = getattr(self, attribute)
+        deadline = Deadline.of(deadline)
+        # yes, timeout will be slightly less than expected, thats okay
+        timeout = datetime.now() + timedelta(seconds=self.TIMEOUT)
+
+        while datetime.now() < timeout:
+            try:
+                fetch(deadline)
+            except OperationCancelled:  # Keep the page as last fetched
+                break
 
-    def __update_from_review(self, wait_for_update=False):
-        # Get the subscribers from the review page, update information
-        page = self.review
+            if getattr(self, attribute).text != page.text:  # compare text
+                break
 
-        if wait_for_update:
-            # yes, timeout will be slightly less than expected, thats okay
-            freq = timedelta(seconds=self.FREQUENCY)
-            timeout = datetime.now() + timedelta(seconds=self.TIMEOUT)
+            if deadline.sleep(self.FREQUENCY):
+                break
 
-            while datetime.now() < timeout:
-                self.__get_review()
-                if self.review.text != page.text:  # compare page text
-                    break
-                sleep(freq.total_seconds())
+    def __update_from_review(self, wait_for_update=False, deadline=None):
+        # Get the subscribers from the review page, update information
+        if wait_for_update:
+            self.__wait_for_change('review', self.__get_review, deadline)
 
-        page_root = self.sympa.get_page_root(self.review)
-        self.__update_subscribers_from_root(page_root)
+        with self._state_lock:
+            page_root = self.sympa.get_page_root(self.review)
+            self.__update_subscribers_from_root(page_root)
+            self._loaded = True
 
-    def __update_from_review_bouncing(self, wait_for_update=False):
+    def __update_from_review_bouncing(self, wait_for_update=False,
+                                      deadline=None):
         # Get information from the review bouncing page, update subscribers
-        page = self.review_bouncing
-
         if wait_for_update:
-            # yes, timeout will be slightly less than expected, thats okay
-            freq = timedelta(seconds=self.FREQUENCY)
-            timeout = datetime.now() + timedelta(seconds=self.TIMEOUT)
-
-            while datetime.now() < timeout:
-                self.__get_review_bouncing()
-                if self.review != page:  # nested comparison handled by python
-                    break
-                sleep(freq.total_seconds())
+            self.__wait_for_change('review_bouncing',
+                                   self.__get_review_bouncing, deadline)
 
-        page_root = self.sympa.get_page_root(self.review_bouncing)
-        self.__update_bouncing_from_root(page_root)
+        with self._state_lock:
+            page_root = self.sympa.get_page_root(self.review_bouncing)
+            self.__update_bouncing_from_root(page_root)
+            self._bouncing_updated = datetime.now()
 
     def __update_subscriber_bouncing_info(self, list_of_trs):
         # Parse information from the table on the review bouncing page
@@ -172,19 +271,30 @@ class MailingList(object, metaclass=MailingList_Meta):
         d['first_bounce'] = None
         d['last_bounce'] = None
 
-        # Initialize bouncing info for each subscriber
-        for subscriber in self._subscribers.values():
-            subscriber.update_bouncing_info(**d)
+        # Parse each row of the bouncing subscribers table
+        infos = {}
 
         for tr in list_of_trs:
-            # For each row of the bouncing subscribers table
             info = tr_to_subscriber_info(tr)
-            self._subscribers[info['email']].update_bouncing_info(**info)
+            infos[self.normalizer.normalize(info['email'])] = info
+
+        # Set bouncing info for each subscriber, defaults if not bouncing
+        for email, subscriber in self._subscribers.items():
+            subscriber.update_bouncing_info(**infos.pop(email, d))
+            self._index.update(email, subscriber)
+
+        # Subscribers not loaded (bounce only refresh), add them, with empty
+        # subscriber information until the review page is parsed
+        for email, info in infos.items():
+            stub = {key: None for key in Subscriber.subscriber_info}
+            stub.update(info, name='', mailing_list=self)
+            self._subscribers[email] = Subscriber(**stub)
+            self._index.update(email, self._subscribers[email])
 
     def __update_bouncing_from_root(self, page_root):
         # From the root of a page, find the rows of the bouncing subscribers
         # table, and send that to be parsed, added to subscribers
-        rows = None
+        rows = []
 
         try:
             # Header of this table is actually in a form, with two rows of
@@ -197,8 +307,8 @@ class MailingList(object, metaclass=MailingList_Meta):
                 print("List '{}' has no bouncing subscriptions".format(
                     self.name), file=stderr)
 
-        if rows:
-            self.__update_subscriber_bouncing_info(rows)
+        # Even with no rows, so that no-longer-bouncing subscribers are reset
+        self.__update_subscriber_bouncing_info(rows)
 
     def __rows_to_Subscribers(self, list_of_trs):
         # Parse the table of subscribers from the review page of this list
@@ -210,7 +320,7 @@ class MailingList(object, metaclass=MailingList_Meta):
             d = {}
             d['email'] = columns[1][0].text.strip()
             d['picture'] = columns[2]
-            d['name'] = columns[3].findall('span')[0].text.strip()
+            d['name'] = (columns[3].findall('span')[0].text or '').strip()
             d['reception'] = columns[4].text.strip()
             d['sources'] = columns[5].text.strip()
             d['sub_date'] = datetime.strptime(columns[6].text.strip(),
@@ -226,7 +336,7 @@ class MailingList(object, metaclass=MailingList_Meta):
             d['last_bounce'] = None
             return (d)
 
-        found_emails = []  # Keep track of the email addresses found
+        found_emails = set()  # Keep track of the email addresses found
         extant = True  # Assume subscribers not empty to start
 
         if not self._subscribers:
@@ -237,19 +347,23 @@ class MailingList(object, metaclass=MailingList_Meta):
             # For each row, if there is an existing subscriber, update it,
             # otherwise, create a new subscriber and add it.
             data = tr_to_subscriber_dict(tr)
-            found_emails += [data['email']]
+            key = self.normalizer.normalize(data['email'])
+            found_emails.add(key)
 
-            if data['email'] in self._subscribers.keys():
-                self._subscribers[data['email']].update_subscriber_info(**data)
+            if key in self._subscribers.keys():
+                self._subscribers[key].update_subscriber_info(**data)
                 # Do not updating bouncing information (with defaults)
             else:
-                self._subscribers[data['email']] = Subscriber(**data)
+                self._subscribers[key] = Subscriber(**data)
+
+            self._index.update(key, self._subscribers[key])
 
         if extant:  # The subscriber list was not empty at start of update
             # Remove Subscribers that were not found on the review page
             for email in list(self._subscribers.keys()):
                 if email not in found_emails:
                     self._subscribers.pop(email)
+                    self._index.remove(email)
 
     def __update_subscribers_from_root(self, page_root):
         # Update the subscribers of this MailingList from page root
@@ -277,7 +391,8 @@ class MailingList(object, metaclass=MailingList_Meta):
         # Alternatively, can use the following:
         # page = self.sympa.get_page('dump', self.name, 'light')
         # subscribers = [x for x in page.text.split('\n') if x is not '']
-        subscribers = list(self.get_subscribers().keys())
+        # As the server has them, rather than their canonical forms
+        subscribers = [s.email for s in self.get_subscribers().values()]
 
         if filename:
             with open(filename, 'w+') as subscriber_list:
@@ -289,9 +404,11 @@ class MailingList(object, metaclass=MailingList_Meta):
     def get_subscribers(self):
         """
         Get the subscriber dictionary
-        :return: dict<Subscriber>: the subscriber dictionary
+        :return: dict<Subscriber>: a copy of the subscriber dictionary, taken
+        between refreshes
         """
-        return (self._subscribers)
+        with self._state_lock:
+            return (dict(self._subscribers))
 
     def get_bouncing_email_list(self, filename=None):
         """
@@ -299,7 +416,7 @@ class MailingList(object, metaclass=MailingList_Meta):
         :param filename: str: write list to this file
         :return: list<str>: list of subscriber emails
         """
-        subscribers = list(self.get_bouncing().keys())
+        subscribers = [s.email for s in self.get_bouncing().values()]
 
         if filename:
             with open(filename, 'w+') as bouncing_list:
@@ -314,7 +431,84 @@ class MailingList(object, metaclass=MailingList_Meta):
         :return: dict<Subscriber>: The bouncing subscribers
         """
         # Each email:subscriber pair if that subscriber is bouncing
-        return ({e: s for e, s in self._subscribers.items() if s.bouncing})
+        with self._state_lock:
+            return ({e: self._subscribers[e] for e in self._index.bouncing})
+
+    def query(self, bouncing=None, reception=None, sources=None,
+              joined_after=None, joined_before=None, updated_after=None,
+              updated_before=None, min_bounce_score=None,
+              max_bounce_score=None, order_by=None, reverse=False, limit=None):
+        """
+        Find subscribers using the secondary indexes of this list, rather
+        than scanning every subscriber. All given filters must match
+        :param bouncing: bool: only bouncing, or only non-bouncing subscribers
+        :param reception: str: only subscribers with this reception mode
+        :param sources: str: only subscribers from these sources
+        :param joined_after: datetime: subscribed on or after this date
+        :param joined_before: datetime: subscribed on or before this date
+        :param updated_after: datetime: last updated on or after this date
+        :param updated_before: datetime: last updated on or before this date
+        :param min_bounce_score: float: bounce score of at least this
+        :param max_bounce_score: float: bounce score of at most this
+        :param order_by: str: 'sub_date', 'last_update', 'bounce_score' or
+        'email'; subscribers without a value for the attribute are left out
+        :param reverse: bool: order from the highest value down
+        :param limit: int: return at most this many subscribers
+        :return: list<Subscriber>: the matching subscribers
+        """
+        # Not while a refresh changes the indexes
+        with self._state_lock:
+            index = self._index
+            candidates = []  # Sets of emails, each matching one filter
+
+            if bouncing:
+                candidates += [index.bouncing]
+            if reception is not None:
+                candidates += [index.reception.get(reception, set())]
+            if sources is not None:
+                candidates += [index.sources.get(sources, set())]
+
+            ranges = [('sub_date', joined_after, joined_before),
+                      ('last_update', updated_after, updated_before),
+                      ('bounce_score', min_bounce_score, max_bounce_score)]
+
+            for key, low, high in ranges:
+                if low is not None or high is not None:
+                    candidates += [index.range(key, low, high)]
+
+            matches = None
+
+            for emails in sorted(candidates, key=len):  # Smallest set first
+                matches = set(emails) if matches is None else matches & emails
+
+            def wanted(email):
+                return ((matches is None or email in matches) and
+                        not (bouncing is False and email in index.bouncing))
+
+            if order_by in index.SORTED:
+                # Walk the sorted index, stopping as soon as there are enough
+                found = (e for e in index.ordered(order_by, reverse)
+                         if wanted(e))
+            else:
+                emails = matches
+                if matches is None:
+                    emails = self._subscribers.keys()
+                found = [e for e in emails if wanted(e)]
+
+                if order_by == 'email':
+                    found.sort(reverse=reverse)
+
+            return ([self._subscribers[e] for e in islice(found, limit)])
+
+    def top_bouncing(self, n=10):
+        """
+        The subscribers with the highest bounce scores
+        :param n: int: how many subscribers
+        :return: list<Subscriber>: subscribers, highest bounce score first
+        """
+        with self._state_lock:  # Not while a refresh changes the index
+            emails = self._index.ordered('bounce_score', reverse=True)
+            return ([self._subscribers[e] for e in islice(emails, n)])
 
     def __reset_bouncing_request(self, email):
         """
@@ -328,23 +522,48 @@ class MailingList(object, metaclass=MailingList_Meta):
                 'action_resetbounce': 'Reset errors for selected users'}
         return (data)
 
-    def __send_concurrent_requests(self, requests):
+    def __send_concurrent_requests(self, requests, journal=None, op=None,
+                                   deadline=None):
         # Sends concurrent requests through the session using the predefined
-        # max concurrent threads
+        # max concurrent threads. Requests are (n, data) pairs; with a journal,
+        # each accepted request is acknowledged by its n. Once the deadline
+        # passes (or is cancelled) no more requests are sent. Returns the set
+        # of n of the accepted requests
         concurrent = self.sympa.MAX_CONCURRENT_REQUEST_THREADS  # concurrent lim
         q = Queue(concurrent * 2)  # queue twice as large as number of threads
         threads = []
+        accepted = set()
+        deadline = Deadline.of(deadline)
 
         def worker():
             # Worker posts the request
             while True:
-                data = q.get()  # Request data from some __request method
+                item = q.get()  # Request data from some __request method
 
-                if data is None:
+                if item is None:
                     break
 
-                self.sympa.post(**data)  # Post this request
-                q.task_done()
+                n, data = item
+
+                try:
+                    if deadline.done:  # Drain the queue without sending
+                        continue
+
+                    # Post this request
+                    response = self.sympa.post(deadline=deadline, **data)
+
+                    if response.ok:
+                        accepted.add(n)
+                        if journal:
+                            journal.ack(op, n)
+                except OperationCancelled:
+                    pass
+                except Exception as err:
+                    print("Request to list '{}' failed: {}".format(self.name,
+                                                                   err),
+                          file=stderr)
+                finally:
+                    q.task_done()
 
         # create a number of workers equal to the concurrency limit, start them
         for i in range(concurrent):
@@ -354,6 +573,9 @@ class MailingList(object, metaclass=MailingList_Meta):
 
         # Send requests to the queue to be executed by workers
         for request in requests:
+            if deadline.done:
+                break
+
             q.put(request)
 
         # Wait for all tasks to be done
@@ -366,198 +588,211 @@ class MailingList(object, metaclass=MailingList_Meta):
         for t in threads:
             t.join()
 
-    def reset_bouncing(self):
+        return (accepted)
+
+    def __run_bulk(self, action, requests, journal=None, op=None,
+                   deadline=None):
+        # Send the requests of a bulk operation, then wait for the list to
+        # reflect them. With a journal, the requests are recorded before they
+        # are sent (unless resuming operation op), and the operation is marked
+        # done once every request was accepted and the list was refreshed.
+        # Returns a BulkResult, which is partial if the deadline passed
+        if type(journal) is str:
+            journal = OperationJournal(journal)
+
+        if journal and op is None:
+            op = journal.begin(self.name, action, [r for n, r in requests])
+
+        deadline = Deadline.of(deadline)
+        accepted = self.__send_concurrent_requests(requests, journal, op,
+                                                   deadline)
+        verified = False
+
+        if not requests:  # Nothing was sent, so there is nothing to wait for
+            verified = True
+        elif not deadline.done:
+            try:
+                if action in self.BOUNCING_ACTIONS:
+                    self.__update_from_review_bouncing(True, deadline)
+                else:
+                    self.__update_subscribers(True, deadline)
+
+                verified = not deadline.done
+            except Exception as err:  # Sent, but not verified
+                print("Verifying '{}' on list '{}' failed: {}".format(
+                    action, self.name, err), file=stderr)
+
+        if journal and verified and len(accepted) == len(requests):
+            journal.done(op)
+
+        return (BulkResult(action,
+                           [r for n, r in requests if n in accepted],
+                           [r for n, r in requests if n not in accepted],
+                           verified))
+
+    def resume(self, journal, deadline=None):
+        """
+        Resume the interrupted bulk operations of this list recorded in a
+        journal, sending only the requests that were never acknowledged
+        :param journal: str or OperationJournal: the journal
+        :param deadline: float or Deadline: seconds allowed for the operation
+        :return: list<BulkResult>: the result of each resumed operation
+        """
+        if type(journal) is str:
+            journal = OperationJournal(journal)
+
+        results = []
+
+        for operation in journal.pending():
+            if operation['list'] == self.name:
+                results += [self.__run_bulk(operation['action'],
+                                            operation['remaining'], journal,
+                                            operation['op'], deadline)]
+
+        return (results)
+
+    def reset_bouncing(self, journal=None, deadline=None):
         """
         Reset the bouncing email addresses for this list
-        :return:
+        :param journal: str or OperationJournal: record the operation here,
+        so that it can be resumed if interrupted
+        :param deadline: float or Deadline: seconds allowed for the operation
+        :return: BulkResult: the requests accepted, and any remaining
         """
         requests = []
 
-        for email in self.get_bouncing().keys():
-            reset_request = self.__reset_bouncing_request(email)
+        for subscriber in self.get_bouncing().values():
+            reset_request = self.__reset_bouncing_request(subscriber.email)
             requests += [reset_request]
 
-        self.__send_concurrent_requests(requests)
-        self.__update_from_review_bouncing(wait_for_update=True)
+        return (self.__run_bulk('reset_bouncing', list(enumerate(requests)),
+                                journal, deadline=deadline))
 
-    def reset_bouncing_subscriber(self, email):
+    def reset_bouncing_subscriber(self, email, deadline=None):
         """
         Reset a single bouncing subscriber
         :param email: str: email to reset
+        :param deadline: float or Deadline: seconds allowed for the operation
         :return: response: the result of the reset request
         """
+        email = self.__server_email(email)
         data = self.__reset_bouncing_request(email)  # Data to be sent
-        response = self.sympa.post(**data)  # Post the data
-        self.__update_from_review_bouncing(wait_for_update=True)
+        response = self.sympa.post(deadline=deadline, **data)  # Post the data
+        self.__update_from_review_bouncing(True, deadline)
         return (response)
 
-    def remove_bouncing_subscribers(self):
+    def remove_bouncing_subscribers(self, journal=None, deadline=None):
         """
         Delete all bouncing email addresses from the list
-        :return:
+        :param journal: str or OperationJournal: record the operation here,
+        so that it can be resumed if interrupted
+        :param deadline: float or Deadline: seconds allowed for the operation
+        :return: BulkResult: the requests accepted, and any remaining
         """
-        bouncing = list(self.get_bouncing().keys())  # list of email adddresses
+        # list of email addresses, as the server has them
+        bouncing = [s.email for s in self.get_bouncing().values()]
         requests = []
 
         for subscriber in bouncing:  # Add a request to the list for each email
             requests += [self.__remove_subscriber_request(subscriber)]
 
-        self.__send_concurrent_requests(requests)  # send all requests
-        self.__update_subscribers(wait_for_update=True)  # Update
+        # send all requests, then update
+        return (self.__run_bulk('remove_bouncing_subscribers',
+                                list(enumerate(requests)), journal,
+                                deadline=deadline))
 
-    def set_subscribers(self, sub_obj):
+    def set_subscribers(self, sub_obj, columns=None, delimiter=',',
+                        journal=None, deadline=None):
         """
         Set the subscribers for the current list. First, determine which email
         addresses must be added, then determine which need to be removed. For
         each of these email addresses (and actions), generate a request. Then,
         send the requests concurrently.
-        :param sub_obj: obj: something convertible to dict<Subscriber>
-        :return:
+        :param sub_obj: obj: filename (plain, .gz, .bz2, .csv), open file
+        handle, dict, or any iterable of str, (email, name) or Subscriber
+        :param columns: tuple: (email column, name column) for CSV input
+        :param delimiter: str: the delimiter of CSV input
+        :param journal: str or OperationJournal: record the operation here,
+        so that it can be resumed if interrupted
+        :param deadline: float or Deadline: seconds allowed for the operation
+        :return: BulkResult: the requests accepted, and any remaining
         """
+        requests = self.__plan_subscribers(sub_obj, columns, delimiter)
 
-        def __to_dict(x):
-            return {'email': x.email, 'real_name': x.name}
+        if not requests:
+            return (BulkResult('set_subscribers', [], [], True))
 
-        # Convert possible input objects to dict<Subscriber>, then get values
-        subscribers = self.__subs_from_obj(sub_obj)
-        subscribers_list = list(subscribers.values())
-        # get just the input emails
-        emails = [x.email for x in subscribers_list]
-        # self email list is keys for subscribers
-        self_emails = list(self._subscribers.keys())
-        # S in input list, but S not in current list, so add S to current
-        add_m = [x for x in emails if x not in self_emails]
-        # take a subscriber, return a dict of just the email and name
-        additions = [__to_dict(subscribers[x]) for x in add_m]
-        # S in current list, but S not in input list, so remove S from current
-        deletions = [x for x in self_emails if x not in emails]
-        # Formulate requests for Subscribers to be added to the current
-        add_requests = [self.__add_subscriber_request(**x) for x in additions]
-        # Formulate deletion requests for Subscribers to be removed from current
-        del_requests = [self.__remove_subscriber_request(x) for x in deletions]
-        # combine this list into one list of requests
-        requests = add_requests + del_requests
-        # determine the number of concurrent requests and make a Queue
-        if requests:
-            self.__send_concurrent_requests(requests)
-            self.__update_subscribers(wait_for_update=True)
-
-    def __subs_from_list(self, subscribers):
-        # Generate a list of subscribers from a possibly mixed list of str and
-        # Subscriber
-        new_subscriber_list = []
-
-        for item in subscribers:
-            if type(item) is Subscriber:
-                item.mailing_list = self
-                new_subscriber_list += [item]
-            elif type(item) is tuple:
-                if len(item) == 2 and all(type(x) is str for x in list(item)):
-                    s = Subscriber(email=item[0],
-                                   name=item[1],
-                                   mailing_list=self)
-                    new_subscriber_list += [s]
-                else:
-                    print("Could not parse subscriber item: {}".format(item),
-                          file=stderr)
-            elif type(item) is str:
-                s = Subscriber(email=item,
-                               name="",
-                               mailing_list=self)
-                new_subscriber_list += [s]
-            else:
-                print("Could not parse subscriber item: {}".format(item),
-                      file=stderr)
-
-        return (new_subscriber_list)
-
-    def __subs_from_dict(self, subscribers):
-        # Create list<Subscriber> from some dictionary of email: name pairs
-        new_subscriber_list = []
-
-        for key, value in subscribers.items():
-            if type(key) is str and type(value) is str:
-                s = Subscriber(email=key, name=value, mailing_list=self)
-                new_subscriber_list += [s]
-            elif type(key) is str and type(value) is Subscriber:
-                new_subscriber_list += [value]
-
-        return (new_subscriber_list)
-
-    def __subs_from_file(self, subscribers):
-        # Parse file of 'email name' lines, and convert them to dict<Subscriber>
-        new_subscriber_list = []
-
-        with open(subscribers, 'r+') as f_h:
-            for line in f_h.readlines():
-                if line is not "":
-                    chunks = line.split()
-                    email = chunks[0].strip()  # [email] First Last
-                    name = ""
-
-                    if len(chunks) >= 2:  # IF email First Last
-                        name = " ".join(chunks[1:]).strip()  # email [Name Name]
-
-                    s = Subscriber(email=email, name=name, mailing_list=self)
-                    new_subscriber_list += [s]
-
-        return (new_subscriber_list)
-
-    def __subs_from_obj(self, subscribers):
-        # Convert the list of Subscribers to a dictionary
-        def __sub_d(list_of_Subscribers):
-            dictionary = {}
-
-            for sub in list_of_Subscribers:
-                dictionary[sub.email] = sub
-
-            return (dictionary)
-
-        # Early versions parsed the subscribers into a list, rather than a dict,
-        # and this function used to be the top level method that would handle
-        # incoming data. Rather than changing this handling, I just added
-        # a step to convert this list to a dictionary -- yes, this will result
-        # in a dictionary being converted to a list and back to a dictionary in
-        # some cases -- but it also handles ill formed dictionaries as well
-        def sub_list(subs):
-            if type(subs) is list:
-                if all([type(x) is Subscriber for x in subs]):
-                    return (subs)
-                else:
-                    return (self.__subs_from_list(subs))
-            elif type(subs) is dict:
-                if all([type(x) is Subscriber for x in subs.values()]):
-                    return (subs.values())
-                else:
-                    return (self.__subs_from_dict(subs))
-            elif type(subs) is str:
-                if isfile(subs):
-                    return (self.__subs_from_file(subs))
+        return (self.__run_bulk('set_subscribers', list(enumerate(requests)),
+                                journal, deadline=deadline))
 
-            return ([])
+    def __plan_subscribers(self, sub_obj, columns=None, delimiter=','):
+        # Diff the input against the current subscribers, returning the
+        # requests needed to make the list match the input. The input is read
+        # in one pass, keeping only its email: name map. Both sides are keyed
+        # by canonical address, so only real membership differences count
+        subscribers = self.__subs_from_obj(sub_obj, columns, delimiter)
 
-        return (__sub_d(sub_list(subscribers)))
+        with self._state_lock:  # An update may be applying a new parse
+            current = dict(self._subscribers)
+
+        # S in input list, but S not in current list, so add S to current
+        # (by the address as given, never its canonical form)
+        add_requests = [self.__add_subscriber_request(*subscribers[e])
+                        for e in subscribers
+                        if e not in current]
+        # S in current list, but S not in input list, so remove S from current
+        # (by the address as the server has it)
+        del_requests = [self.__remove_subscriber_request(s.email)
+                        for e, s in current.items()
+                        if e not in subscribers]
+        return (add_requests + del_requests)
+
+    def __subs_from_obj(self, subscribers, columns=None, delimiter=','):
+        # Stream any supported input into a dictionary of canonical email:
+        # (email as given, name) pairs, merging duplicates
+        source = SubscriberSource(subscribers, columns, delimiter)
+        return (source.to_roster(self.normalizer))
+
+    def __server_email(self, email):
+        # The address of a subscriber as the server has it, if it is known
+        subscriber = self._subscribers.get(self.normalizer.normalize(email))
+        return (subscriber.email if subscriber else email)
 
     def __add_subscriber_request(self, email, real_name=""):
         # Request data for adding a subscriber
+        return (self.__add_subscribers_request([(email, real_name)]))
+
+    def __add_subscribers_request(self, subscribers):
+        # Request data for adding several (email, real name) subscribers,
+        # one "email name" line each
+        dump = ['{} {}'.format(e, n).strip() for e, n in subscribers]
         data = {'list': '{}'.format(self.name),
                 'action_add': 'Add subscribers',
                 'quiet': 'on',
                 'used': 'true',
-                'dump': '{} {}'.format(email, real_name).strip()
+                'dump': '\n'.join(dump)
                 }
         return (data)
 
-    def add_subscriber(self, email, real_name=""):
+    def add_subscriber(self, email, real_name="", deadline=None):
         """
         Add a subscriber to this MailingList
         :param email: str: the email address
         :param real_name: str: the real name of the person being added
-        :return: response: the response of the request to add
+        :param deadline: float or Deadline: seconds allowed for the operation
+        :return: response: the response of the request to add, or None if
+        buffered by a batch
         """
+        email = email.strip()  # Sent as given, only compared normalized
+        batch = self._current_batch()
+
+        if batch is not None:
+            batch.add(email, real_name)
+            return (None)
+
         data = self.__add_subscriber_request(email, real_name)
-        response = self.sympa.post(**data)
-        self.__update_subscribers(wait_for_update=True)  # Update
+        response = self.sympa.post(deadline=deadline, **data)
+        self.__update_subscribers(True, deadline)  # Update
         return (response)
 
     def __remove_subscriber_request(self, email):
@@ -569,13 +804,95 @@ class MailingList(object, metaclass=MailingList_Meta):
                 }
         return (data)
 
-    def remove_subscriber(self, email):
+    def __remove_subscribers_request(self, emails):
+        # Request data for removing several subscribers, selected together
+        data = self.__remove_subscriber_request(None)
+        data['email'] = emails
+        return (data)
+
+    def remove_subscriber(self, email, deadline=None):
         """
         Remove a subcriber from this MailingList
         :param email: str: the email address
-        :return:
+        :param deadline: float or Deadline: seconds allowed for the operation
+        :return: response: the response of the request to remove, or None if
+        buffered by a batch
         """
-        data = self.__remove_subscriber_request(email)
-        response = self.sympa.post(**data)
-        self.__update_subscribers(wait_for_update=True)
+        batch = self._current_batch()
+
+        if batch is not None:
+            batch.remove(email)
+            return (None)
+
+        data = self.__remove_subscriber_request(self.__server_email(email))
+        response = self.sympa.post(deadline=deadline, **data)
+        self.__update_subscribers(True, deadline)
         return (response)
+
+    def batch(self, max_size=100, max_delay=None, journal=None,
+              deadline=None):
+        """
+        Buffer add_subscriber and remove_subscriber calls, sending them as a
+        few consolidated requests with a single refresh; see WriteBatch
+            with mailing_list.batch(max_delay=5):
+                mailing_list.add_subscriber('new@example.com')
+        Only calls made by the thread that opened the batch are buffered;
+        inside a batch that this thread already has open, that batch is used
+        :param max_size: int: send once this many addresses are buffered
+        :param max_delay: float: send this many seconds after the first
+        buffered call, or only on size and exit if None
+        :param journal: str or OperationJournal: record each send here, so
+        that it can be resumed if interrupted
+        :param deadline: float or Deadline: seconds allowed for the batch
+        :return: WriteBatch: the batch, to be used as a context manager
+        """
+        batch = self._current_batch()
+
+        if batch is not None:
+            return (batch)
+
+        return (WriteBatch(self, max_size, max_delay, journal, deadline))
+
+    def _current_batch(self):
+        # The WriteBatch this thread has open on the list, if any. Calls it
+        # buffers skip the update and admin check of MailingList_Meta, which
+        # _send_batch makes once for the whole batch
+        return (getattr(self._open_batch, 'batch', None))
+
+    def _send_batch(self, pending, journal=None, deadline=None):
+        # Send the calls buffered by a WriteBatch, as {normalized email:
+        # (email as given, real name), or None to remove}. Calls the list
+        # already reflects are dropped, the rest are sent BATCH_CHUNK
+        # addresses per request, then the list is refreshed once. Returns a
+        # BulkResult
+        self.update(deadline=deadline)  # Membership to compare against
+
+        if not self._admin:  # Nothing can be sent
+            print(MailingList_Meta.AUTHMSG.format(self.name), file=stderr)
+            return (None)
+
+        adds = []
+        removes = []
+
+        for key, add in pending.items():
+            subscriber = self._subscribers.get(key)
+
+            if add is None and subscriber:
+                removes += [subscriber.email]  # As the server has it
+            elif add is not None and not subscriber:
+                adds += [add]
+
+        chunk = self.BATCH_CHUNK
+        requests = []
+
+        for i in range(0, len(adds), chunk):
+            requests += [self.__add_subscribers_request(adds[i:i + chunk])]
+        for i in range(0, len(removes), chunk):
+            requests += [self.__remove_subscribers_request(
+                removes[i:i + chunk])]
+
+        if not requests:
+            return (BulkResult('batch', [], [], True))
+
+        return (self.__run_bulk('batch', list(enumerate(requests)), journal,
+                                deadline=deadline))
@@ -1,26 +1,40 @@
 #!/usr/bin/env python3
+from functools import wraps
+from inspect import signature
 from sys import stderr
 
+from Sympal.Deadline import Deadline
+
 
 class MailingList_Meta(type):
     # The methods that require the user to be both logged in and have admin
     # privileges for the list instance
     ADMIN_METHODS = ['get_subscribers_email_list',
-                     'get_bouncing_email_list',
                      'get_subscribers',
-                     'get_bouncing',
+                     'query',
                      'set_subscribers',
                      'add_subscriber',
                      'remove_subscriber',
-                     'reset_bouncing',
-                     'reset_bouncing_subscriber',
-                     'remove_bouncing_subscribers']
+                     'remove_bouncing_subscribers',
+                     'resume']
+    # The admin methods that only need the bouncing information to be up to
+    # date, so only the (smaller) review bouncing page is fetched for them
+    BOUNCING_METHODS = ['get_bouncing_email_list',
+                        'get_bouncing',
+                        'top_bouncing',
+                        'reset_bouncing',
+                        'reset_bouncing_subscriber']
+
+    # The admin methods that a WriteBatch open in the calling thread buffers
+    # instead, so they are not checked until the batch is sent
+    BATCHED_METHODS = ['add_subscriber',
+                       'remove_subscriber']
 
     AUTHMSG = ("The current user is not an administrator of the list '{}'. "
                "Access Denied.")
 
     @classmethod
-    def create_check_populated_before_exec(cls, func):
+    def create_check_populated_before_exec(cls, func, update='update'):
         """
         A wrapper for methods of a MailingList instance to prevent those
         methods from running if the current user of the parent Sympa instance
@@ -28,21 +42,47 @@ class MailingList_Meta(type):
         :return: func: wrapped function that checks instance ownership and then
         performs the original action of the method.
         :param func: function: the method to be wrapped
+        :param update: str: name of the MailingList method that updates the
+        information needed by func
         :return: function: the wrapped function
         """
+        # Whether or not func itself takes the deadline of the call, and at
+        # which position of args (self excluded) it may be given
+        parameters = list(signature(func).parameters)
+        takes_deadline = 'deadline' in parameters
+        position = parameters.index('deadline') - 1 if takes_deadline else 0
+        batched = func.__name__ in cls.BATCHED_METHODS
 
+        @wraps(func)
         def check_populated_before_exec(self, *args, **kwargs):
             """
             Check that the subscribers have been fully populated and that the
             user is an administrator for this list instance.
             :param self: MailingList: this
             :param args: list: positional arguments
-            :param kwargs: dict: keyword arguments
+            :param kwargs: dict: keyword arguments, which may include a
+            deadline (seconds or Deadline) and cancel (CancellationToken) for
+            the whole call, update included
             :return:
             """
+            if batched and self._current_batch() is not None:
+                # Only buffered: the batch updates and checks when it sends
+                return (func(self, *args, **kwargs))
+
+            cancel = kwargs.pop('cancel', None)
+
+            if takes_deadline and len(args) > position:  # Given positionally
+                args = list(args)
+                deadline = args[position] = Deadline.of(args[position], cancel)
+            else:
+                deadline = Deadline.of(kwargs.pop('deadline', None), cancel)
+
+                if takes_deadline:
+                    kwargs['deadline'] = deadline
+
             # First update the given list, to populate subscribers, and check
             # the ownership
-            self.update()
+            getattr(self, update)(deadline=deadline)
 
             if self._admin:  # Current user has admin privileges on the list
                 return (func(self, *args, **kwargs))
@@ -60,4 +100,9 @@ class MailingList_Meta(type):
             if m in attrs:
                 attrs[m] = cls.create_check_populated_before_exec(attrs[m])
 
+        for m in cls.BOUNCING_METHODS:
+            if m in attrs:
+                attrs[m] = cls.create_check_populated_before_exec(
+                    attrs[m], 'update_bouncing')
+
         return (type.__new__(cls, name, bases, attrs))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+from json import dumps
+from json import loads
+from os import fsync
+from os import remove
+from os.path import expanduser
+from os.path import isfile
+from sys import stderr
+from threading import Lock
+from uuid import uuid4
+
+
+class OperationJournal:
+    def __init__(self, path):
+        """
+        A write-ahead journal of bulk operations. Each operation's requests
+        are recorded before any is sent, each request is acknowledged once
+        the server accepted it, and the operation is marked done once the
+        list has been verified. An interrupted operation can then be resumed
+        by sending only the requests that were never acknowledged
+        :param path: str: the journal file, appended to as JSON lines
+        """
+        self.path = expanduser(path)
+        self._lock = Lock()
+
+    def __append(self, entry, sync=False):
+        # Append an entry to the journal, forcing it to disk if sync
+        with self._lock:
+            with open(self.path, 'a') as f_h:
+                print(dumps(entry), file=f_h)
+                if sync:
+                    f_h.flush()
+                    fsync(f_h.fileno())
+
+    def begin(self, list_name, action, requests):
+        """
+        Record the planned requests of an operation, before sending any
+        :param list_name: str: the name of the list
+        :param action: str: the MailingList method performing the operation
+        :param requests: list<dict>: the data of each request
+        :return: str: the id of the operation
+        """
+        op = uuid4().hex
+        self.__append({'type': 'plan', 'op': op, 'list': list_name,
+                       'action': action, 'requests': requests}, sync=True)
+        return (op)
+
+    def ack(self, op, n):
+        """
+        Record that a request of an operation was accepted by the server
+        :param op: str: the id of the operation
+        :param n: int: the index of the request in the planned requests
+        :return:
+        """
+        self.__append({'type': 'ack', 'op': op, 'n': n})
+
+    def done(self, op):
+        """
+        Record that an operation is complete
+        :param op: str: the id of the operation
+        :return:
+        """
+        self.__append({'type': 'done', 'op': op}, sync=True)
+
+    def pending(self):
+        """
+        The operations that were begun but not completed
+        :return: list<dict>: for each operation, its 'op' id, 'list',
+        'action', and the 'remaining' (index, request) pairs never acknowledged
+        """
+        if not isfile(self.path):
+            return ([])
+
+        plans = {}
+        acked = {}
+
+        with open(self.path, 'r') as f_h:
+            for line in f_h:
+                try:
+                    entry = loads(line)
+                except ValueError:  # A torn final line, from a crash
+                    print("Skipping bad journal line: {}".format(line.strip()),
+                          file=stderr)
+                    continue
+
+                if entry['type'] == 'plan':
+                    plans[entry['op']] = entry
+                    acked[entry['op']] = set()
+                elif entry['type'] == 'ack' and entry['op'] in acked:
+                    acked[entry['op']].add(entry['n'])
+                elif entry['type'] == 'done':
+                    plans.pop(entry['op'], None)
+
+        return ([{'op': op,
+                  'list': plan['list'],
+                  'action': plan['action'],
+                  'remaining': [(n, r) for n, r in enumerate(plan['requests'])
+                                if n not in acked[op]]}
+                 for op, plan in plans.items()])
+
+    def clear(self):
+        """
+        Remove the journal
+        :return:
+        """
+        with self._lock:
+            if isfile(self.path):
+                remove(self.path)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+from csv import DictWriter
+from gzip import open as gzip_open
+from json import dumps
+
+from Sympal.Subscriber import Subscriber
+
+
+class RecordWriter:
+    # Supported output formats
+    FORMATS = ['csv', 'jsonl']
+    # Columns of csv output, in order
+    FIELDS = ['list'] + Subscriber.record_fields
+
+    def __enter__(self):
+        return (self)
+
+    def __init__(self, path, format='csv', compress=None):
+        """
+        Write subscriber records to a file as they arrive, one at a time
+        :param path: str: the file to write
+        :param format: str: 'csv' or 'jsonl'
+        :param compress: bool: gzip the output, by default when the path ends
+        with '.gz'
+        """
+        if format not in self.FORMATS:
+            raise ValueError("Unknown export format '{}', expected one of "
+                             "{}".format(format, self.FORMATS))
+
+        if compress is None:
+            compress = path.endswith('.gz')
+
+        self.path = path
+        self.format = format
+        opener = gzip_open if compress else open
+        self.f_h = opener(path, 'wt', newline='')
+        self.csv = None
+
+        if format == 'csv':
+            self.csv = DictWriter(self.f_h, fieldnames=self.FIELDS)
+            self.csv.writeheader()
+
+    def __exit__(self, ex_type, ex_val, traceback):
+        self.close()
+
+    def write(self, record):
+        """
+        Write a single record
+        :param record: dict: a record, as from Subscriber.to_record
+        :return:
+        """
+        if self.csv:
+            self.csv.writerow(record)
+        else:
+            print(dumps(record), file=self.f_h)
+
+    def close(self):
+        """
+        Close the output file
+        :return:
+        """
+        self.f_h.close()
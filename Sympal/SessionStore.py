@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+from json import dump
+from json import load
+from os import O_CREAT
+from os import O_TRUNC
+from os import O_WRONLY
+from os import fdopen
+from os import open as os_open
+from os import remove
+from os import replace
+from os.path import expanduser
+from os.path import isfile
+from sys import stderr
+from time import time
+
+
+class SessionStore:
+    # Cookie attributes that are saved, and restored, for each cookie
+    COOKIE_ATTRS = ['name', 'value', 'domain', 'path', 'expires', 'secure']
+
+    def __init__(self, path):
+        """
+        A file that keeps the cookies and list names of a logged in session,
+        so that later processes can reuse the session instead of logging in
+        :param path: str: the file in which to store the session
+        """
+        self.path = expanduser(path)
+
+    def load(self, url, email=None):
+        """
+        Load a stored session for the given server (and user)
+        :param url: str: the sympa url the session must belong to
+        :param email: str: the user the session must belong to, if given
+        :return: dict: the stored session, or None if there is no such session
+        """
+        if not isfile(self.path):
+            return (None)
+
+        try:
+            with open(self.path, 'r') as f_h:
+                session = load(f_h)
+        except (OSError, ValueError) as err:
+            print("Could not read session '{}': {}".format(self.path, err),
+                  file=stderr)
+            return (None)
+
+        if session.get('url') != url:
+            return (None)
+
+        if email is not None and session.get('email') != email:
+            return (None)
+
+        return (session)
+
+    def save(self, url, email, cookies, list_names):
+        """
+        Store a session, readable only by the current user (it holds cookies)
+        :param url: str: the sympa url of the session
+        :param email: str: the logged in user
+        :param cookies: RequestsCookieJar: the cookies of the session
+        :param list_names: list<str>: the names of the lists of the user
+        :return:
+        """
+        session = {'url': url,
+                   'email': email,
+                   'saved': time(),
+                   'cookies': [{a: getattr(c, a) for a in self.COOKIE_ATTRS}
+                               for c in cookies],
+                   'lists': list(list_names)}
+        temp = '{}.tmp'.format(self.path)
+
+        with fdopen(os_open(temp, O_WRONLY | O_CREAT | O_TRUNC, 0o600),
+                    'w') as f_h:
+            dump(session, f_h)
+
+        replace(temp, self.path)  # Never leave a half written session
+
+    def restore_cookies(self, session, cookies):
+        """
+        Set the cookies of a stored session into a cookie jar
+        :param session: dict: a session, as returned by load
+        :param cookies: RequestsCookieJar: the cookie jar to fill
+        :return:
+        """
+        for cookie in session.get('cookies', []):
+            cookies.set(**cookie)
+
+    def clear(self):
+        """
+        Remove the stored session, if any
+        :return:
+        """
+        if isfile(self.path):
+            remove(self.path)
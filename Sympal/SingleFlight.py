@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError
+from threading import Lock
+
+from Sympal.Deadline import Deadline
+from Sympal.Deadline import OperationCancelled
+
+
+class SingleFlight:
+    # Seconds between deadline checks while waiting on another caller's call
+    WAIT_POLL = 0.5
+
+    def __init__(self):
+        """
+        Coalesces concurrent calls for the same key: the first caller runs
+        the call, and callers arriving while it is in flight wait for it and
+        share its result (or exception) instead of running it again
+        """
+        self._lock = Lock()
+        self._flights = {}  # key: Future of the call in flight
+
+    def do(self, key, func, deadline=None):
+        """
+        Run func, unless a call for key is already in flight, in which case
+        wait for that call instead
+        :param key: hashable: what the call fetches, e.g. a page
+        :param func: function: the call, taking no arguments
+        :param deadline: Deadline: how long to wait for another caller's
+        call; if that call was cancelled by its own deadline, it is run again
+        under this one
+        :return: obj: the result of the call
+        :raises OperationCancelled: if the deadline passed or was cancelled
+        """
+        deadline = Deadline.of(deadline)
+
+        while True:
+            with self._lock:
+                future = self._flights.get(key)
+                leader = future is None
+
+                if leader:
+                    future = self._flights[key] = Future()
+
+            if leader:
+                return (self.__run(key, func, future))
+
+            try:
+                return (self.__wait(future, deadline))
+            except OperationCancelled:
+                # The call was cancelled: give up if this caller was too,
+                # otherwise run it again
+                deadline.check()
+
+    def __run(self, key, func, future):
+        # Run the call as leader, then share the outcome with any waiters. The
+        # flight ends before waiters wake, so a retry starts a new one
+        try:
+            result = func()
+        except BaseException as err:
+            self.__land(key)
+            future.set_exception(err)
+            raise
+
+        self.__land(key)
+        future.set_result(result)
+        return (result)
+
+    def __land(self, key):
+        # End the flight of key
+        with self._lock:
+            del self._flights[key]
+
+    def __wait(self, future, deadline):
+        # Wait for another caller's call, but no later than the deadline
+        while True:
+            remaining = deadline.remaining()
+            poll = self.WAIT_POLL if remaining is None else \
+                min(self.WAIT_POLL, remaining)
+
+            try:
+                return (future.result(timeout=poll))
+            except TimeoutError:
+                deadline.check()
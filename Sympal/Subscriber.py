@@ -11,6 +11,9 @@ class Subscriber:
                      'last_bounce']
     # All recognized attributes
     recognized_attrs = subscriber_info + bouncing_info
+    # Attributes written out by exports
+    record_fields = [x for x in recognized_attrs
+                     if x not in ['picture', 'mailing_list']]
 
     def __set_attributes(self, given_dict, allowed_keys):
         # Set attributes of an instance from a dictionary
@@ -71,6 +74,22 @@ class Subscriber:
         """
         self.__set_attributes(kwargs, self.bouncing_info)
 
+    def to_record(self):
+        """
+        Flatten this subscriber into a record of plain values, for export
+        :return: dict: the list name, then every recognized attribute except
+        the picture and the mailing list, with dates in ISO format
+        """
+        record = {'list': getattr(self.mailing_list, 'name', None)}
+
+        for key in self.record_fields:
+            value = getattr(self, key, None)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            record[key] = value
+
+        return (record)
+
     def __repr__(self):
         # <subscriber 'user@example.com' of '<MailingList 'example_list'>'>
         return ("<Subscriber '{}' of '{}'>".format(self.email,
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+from bisect import bisect_left
+from bisect import bisect_right
+from bisect import insort
+from collections import defaultdict
+
+
+class SubscriberIndex:
+    # Attributes kept in sorted indexes, which can be range queried and
+    # walked in order
+    SORTED = ['sub_date', 'last_update', 'bounce_score']
+
+    def __init__(self):
+        """
+        Secondary indexes over the subscribers of a list: the bouncing set,
+        buckets by reception mode and by sources, and sorted (value, email)
+        lists of subscription dates, last update dates and numeric bounce
+        scores. Kept up to date by calling update / remove as subscribers
+        change, so that queries need not scan every subscriber
+        """
+        self.entries = {}  # email: the indexed values of that subscriber
+        self.bouncing = set()
+        self.reception = defaultdict(set)
+        self.sources = defaultdict(set)
+        self.sorted = {x: [] for x in self.SORTED}
+
+    def __len__(self):
+        return (len(self.entries))
+
+    def __values(self, subscriber):
+        # The indexed values of a subscriber
+        score = getattr(subscriber, 'bounce_score', None)
+
+        try:
+            score = float(score)
+        except (TypeError, ValueError):  # 'no score'
+            score = None
+
+        return ({'bouncing': bool(getattr(subscriber, 'bouncing', False)),
+                 'reception': getattr(subscriber, 'reception', None),
+                 'sources': getattr(subscriber, 'sources', None),
+                 'sub_date': getattr(subscriber, 'sub_date', None),
+                 'last_update': getattr(subscriber, 'last_update', None),
+                 'bounce_score': score})
+
+    def update(self, email, subscriber):
+        """
+        Index a subscriber, replacing its previous entries if it changed
+        :param email: str: the key of the subscriber
+        :param subscriber: Subscriber: the subscriber
+        :return:
+        """
+        values = self.__values(subscriber)
+
+        if self.entries.get(email) == values:
+            return
+
+        self.remove(email)
+        self.entries[email] = values
+
+        if values['bouncing']:
+            self.bouncing.add(email)
+
+        for bucket in ['reception', 'sources']:
+            if values[bucket] is not None:
+                getattr(self, bucket)[values[bucket]].add(email)
+
+        for key in self.SORTED:
+            if values[key] is not None:
+                insort(self.sorted[key], (values[key], email))
+
+    def remove(self, email):
+        """
+        Remove a subscriber from the indexes
+        :param email: str: the key of the subscriber
+        :return:
+        """
+        values = self.entries.pop(email, None)
+
+        if values is None:
+            return
+
+        self.bouncing.discard(email)
+
+        for bucket in ['reception', 'sources']:
+            if values[bucket] is not None:
+                emails = getattr(self, bucket)[values[bucket]]
+                emails.discard(email)
+                if not emails:
+                    getattr(self, bucket).pop(values[bucket])
+
+        for key in self.SORTED:
+            if values[key] is not None:
+                entries = self.sorted[key]
+                del entries[bisect_left(entries, (values[key], email))]
+
+    def clear(self):
+        """
+        Remove all subscribers from the indexes
+        :return:
+        """
+        self.__init__()
+
+    def range(self, key, low=None, high=None):
+        """
+        Emails with a sorted attribute in [low, high]
+        :param key: str: one of SORTED
+        :param low: obj: the lowest value, unbounded if None
+        :param high: obj: the highest value, unbounded if None
+        :return: set<str>: the matching emails
+        """
+        entries = self.sorted[key]
+        # Emails are never None, and a value alone sorts before (value, email)
+        start = 0 if low is None else bisect_left(entries, (low,))
+        end = len(entries) if high is None else \
+            bisect_right(entries, (high, chr(0x10ffff)))
+        return ({email for value, email in entries[start:end]})
+
+    def ordered(self, key, reverse=False):
+        """
+        Walk the emails in order of a sorted attribute; subscribers without
+        a value for it are not included
+        :param key: str: one of SORTED
+        :param reverse: bool: walk from the highest value down
+        :return: generator<str>: emails
+        """
+        entries = self.sorted[key]
+        walk = reversed(entries) if reverse else iter(entries)
+        return ((email for value, email in walk))
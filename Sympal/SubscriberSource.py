@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+from bz2 import open as bz2_open
+from csv import reader as csv_reader
+from gzip import open as gzip_open
+from io import BufferedReader
+from io import TextIOBase
+from io import TextIOWrapper
+from os.path import isfile
+from sys import stderr
+
+from Sympal.Subscriber import Subscriber
+
+
+class SubscriberSource:
+    # Openers for compressed roster files, by file extension
+    OPENERS = {'.gz': gzip_open,
+               '.bz2': bz2_open}
+    # Openers for compressed binary handles, by leading magic number
+    MAGIC = {b'\x1f\x8b': gzip_open,
+             b'BZh': bz2_open}
+    # Extensions that mark a roster file as CSV
+    CSV_EXTENSIONS = ['.csv']
+
+    def __init__(self, subscribers, columns=None, delimiter=','):
+        """
+        An iterable of (email, name) pairs read in a single pass from some
+        input of subscribers
+        :param subscribers: obj: a filename (plain, .gz or .bz2), an open file
+        handle, a dict of email: name or email: Subscriber pairs, or any
+        iterable (list, generator, ...) of str, (email, name) or Subscriber
+        :param columns: tuple: (email column, name column) for CSV input,
+        where each is an int index or a str header name; the name column may
+        also be a list of columns to be joined. Giving columns makes a file
+        be read as CSV, regardless of extension
+        :param delimiter: str: the delimiter of CSV input
+        :raises FileNotFoundError: when iterated, if the file does not exist
+        :raises ValueError: when iterated, if the CSV header lacks the columns
+        """
+        self.subscribers = subscribers
+        self.columns = columns
+        self.delimiter = delimiter
+
+    def __iter__(self):
+        subscribers = self.subscribers
+
+        if type(subscribers) is str:
+            # A missing roster must not read as an empty one, which would
+            # plan removing every subscriber
+            if not isfile(subscribers):
+                raise FileNotFoundError("Could not find subscriber file: "
+                                        "{}".format(subscribers))
+
+            yield from self.__from_filename(subscribers)
+        elif type(subscribers) is dict:
+            yield from self.__from_dict(subscribers)
+        elif hasattr(subscribers, 'read'):
+            yield from self.__from_handle(subscribers)
+        else:
+            try:
+                items = iter(subscribers)
+            except TypeError:
+                print("Could not parse subscribers: {}".format(subscribers),
+                      file=stderr)
+                return
+
+            yield from self.__from_items(items)
+
+    def to_roster(self, normalizer):
+        """
+        Consume the input, keyed by canonical address, keeping each address
+        as it was first given, so that it can be sent to the server unchanged
+        :param normalizer: EmailNormalizer: the canonical forms of addresses,
+        and the rule merging the names of duplicates
+        :return: dict<str>: canonical email: (email as given, name) pairs
+        """
+        roster = {}
+
+        for email, name in self:
+            key = normalizer.normalize(email)
+
+            if key:
+                given, old = roster.get(key, (email, None))
+                roster[key] = (given, normalizer.merge_names(old, name))
+
+        return (roster)
+
+    def __from_items(self, items):
+        # Generate pairs from a possibly mixed iterable of str, tuple and
+        # Subscriber
+        for item in items:
+            if type(item) is Subscriber:
+                yield (item.email, getattr(item, 'name', "") or "")
+            elif type(item) is tuple:
+                if len(item) == 2 and all(type(x) is str for x in item):
+                    yield (item[0].strip(), item[1].strip())
+                else:
+                    print("Could not parse subscriber item: {}".format(item),
+                          file=stderr)
+            elif type(item) is str:
+                pair = self.__from_line(item)
+                if pair:
+                    yield (pair)
+            else:
+                print("Could not parse subscriber item: {}".format(item),
+                      file=stderr)
+
+    def __from_dict(self, subscribers):
+        # Generate pairs from a dictionary of email: name or email: Subscriber
+        for key, value in subscribers.items():
+            if type(key) is str and type(value) is str:
+                yield (key.strip(), value.strip())
+            elif type(key) is str and type(value) is Subscriber:
+                yield (value.email, getattr(value, 'name', "") or "")
+            else:
+                print("Could not parse subscriber item: {}".format(key),
+                      file=stderr)
+
+    def __from_filename(self, filename):
+        # Open a (possibly compressed) roster file, then read it line by line
+        opener = open
+        stem = filename.lower()
+
+        for extension, compressed_opener in self.OPENERS.items():
+            if stem.endswith(extension):
+                opener = compressed_opener
+                stem = stem[:-len(extension)]
+                break
+
+        is_csv = any(stem.endswith(x) for x in self.CSV_EXTENSIONS)
+
+        with opener(filename, 'rt', newline='') as f_h:
+            yield from self.__from_handle(f_h, is_csv)
+
+    def __from_handle(self, f_h, is_csv=False):
+        # Read an open file handle without loading it into memory at once.
+        # Anything that is not a text handle yields bytes (gzip, bz2 and
+        # BytesIO handles among them, whatever their mode says)
+        if not isinstance(f_h, TextIOBase):
+            f_h = TextIOWrapper(self.__decompressed(f_h), newline='')
+
+        if is_csv or self.columns is not None:
+            yield from self.__from_csv(f_h)
+        else:
+            for line in f_h:
+                pair = self.__from_line(line)
+                if pair:
+                    yield (pair)
+
+    def __decompressed(self, f_h):
+        # Wrap a binary handle in a decompressor if it starts with a gzip or
+        # bz2 magic number, without consuming anything from it
+        if not hasattr(f_h, 'peek'):  # e.g. BytesIO, buffer it to peek
+            f_h = BufferedReader(f_h)
+
+        head = f_h.peek(3)[:3]
+        for magic, opener in self.MAGIC.items():
+            if head.startswith(magic):
+                return (opener(f_h, 'rb'))
+
+        return (f_h)
+
+    def __from_line(self, line):
+        # Parse 'email First Last' from a line, None if the line is blank
+        chunks = line.split()
+
+        if not chunks:
+            return (None)
+
+        return ((chunks[0].strip(), " ".join(chunks[1:]).strip()))
+
+    def __from_csv(self, f_h):
+        # Parse the configured email and name columns of CSV rows
+        email_col, name_cols = self.columns or (0, 1)
+
+        if type(name_cols) not in (list, tuple):
+            name_cols = [name_cols]
+
+        rows = csv_reader(f_h, delimiter=self.delimiter)
+        wanted = [email_col] + list(name_cols)
+
+        if any(type(x) is str for x in wanted):
+            # Named columns -- the first row is the header
+            header = [x.strip() for x in next(rows, [])]
+            try:
+                wanted = [header.index(x) if type(x) is str else x
+                          for x in wanted]
+            except ValueError:  # Not an empty roster, see __iter__
+                raise ValueError("CSV header {} lacks columns {}".format(
+                    header, wanted))
+
+        email_idx, name_idxs = wanted[0], wanted[1:]
+
+        for row in rows:
+            # Skip short rows, and unnamed header rows (no address in them)
+            if len(row) <= email_idx or '@' not in row[email_idx]:
+                continue
+
+            name = " ".join(row[i].strip() for i in name_idxs if i < len(row))
+            yield ((row[email_idx].strip(), name.strip()))
@@ -1,80 +1,220 @@
 #!/usr/bin/env python3
+from concurrent.futures import TimeoutError
+from contextlib import ExitStack
+from contextlib import contextmanager
+from heapq import merge
+from itertools import chain
+from itertools import islice
+from os import makedirs
+from os.path import join
 from queue import Queue
 from sys import stderr
 from threading import Thread
+from urllib.parse import urlparse
 
-import requests
 from lxml import etree
+from requests.cookies import RequestsCookieJar
+from requests.exceptions import ConnectionError as RequestConnectionError
+from requests.exceptions import Timeout
 
+from Sympal.Deadline import Deadline
+from Sympal.Deadline import OperationCancelled
+from Sympal.EmailNormalizer import EmailNormalizer
 from Sympal.MailingList import MailingList
+from Sympal.MailingList_Meta import MailingList_Meta
+from Sympal.OperationJournal import OperationJournal
+from Sympal.RecordWriter import RecordWriter
+from Sympal.SessionStore import SessionStore
+from Sympal.SingleFlight import SingleFlight
+from Sympal.Transport import Transport
+from Sympal.Watcher import Watcher
+from Sympal.WriteBatch import BatchFlushError
 
 
 class Sympa:
     # XPath for the 'list of lists' on sympa home page
     LISTS_XPATH = etree.XPath('//*[@id="Menus"]/div[3]/ul/li/a/@href')
     MAX_CONCURRENT_REQUEST_THREADS = 4
+    REQUEST_TIMEOUT = 30  # Seconds, for any request without a deadline
+    CANCEL_POLL = 0.5  # Seconds between cancellation checks while queued
 
     def __enter__(self):
         return (self)
 
-    def __init__(self, url):
+    def __init__(self, url, session_store=None, keep_session=False,
+                 scheduler=None, transport=None, normalizer=None):
+        """
+        A connection to a sympa server
+        :param url: str: the sympa url
+        :param session_store: str or SessionStore: file in which to keep the
+        logged in session, so that later instances can skip logging in
+        :param keep_session: bool: on exit, save the session instead of
+        logging out (requires session_store)
+        :param scheduler: HostScheduler: send requests through this shared
+        scheduler, under the concurrency limit of this host
+        :param transport: Transport: sends the requests, e.g. to record or
+        replay them; by default a Transport with a new requests session
+        :param normalizer: EmailNormalizer: canonical forms of addresses for
+        all lists; by default, whitespace trimmed and case folded
+        """
         self.url = url
-        self.session = requests.session()
+        self.host = urlparse(url).netloc
+        self.scheduler = scheduler
+        self.transport = transport or Transport()
+        self.session = self.transport.session
+        self.normalizer = normalizer or EmailNormalizer()
         self.lists = {}
+        self.email = None
+        self._flight = SingleFlight()  # Coalesces landing page fetches
+
+        if type(session_store) is str:
+            session_store = SessionStore(session_store)
+
+        self.session_store = session_store
+        self.keep_session = keep_session
 
     def __exit__(self, ex_type, ex_val, traceback):
-        self.log_out()
+        if self.keep_session and self.session_store:
+            if self.email:
+                self.save_session()
+            # Otherwise never logged in, e.g. the stored session could not be
+            # checked: keep it, as it may still be valid
+        else:
+            self.log_out()
+
         self.close()
 
     def __logged_in(self, page):
         # Check a page for the ability to log out -- signifying logged in
         return ('action_logout' in page.text)
 
-    def __populate_all_lists(self):
-        # Populate all lists using concurrent requests
+    def __each_list(self, func, names=None, deadline=None):
+        # Call func on each named MailingList (all of them by default) using
+        # concurrent worker threads, yielding (name, succeeded) as each call
+        # finishes. Workers stall once the consumer falls behind, so results
+        # never pile up faster than they are used. Once the deadline passes,
+        # the remaining lists are skipped and yielded as not succeeded
         concurrent = self.MAX_CONCURRENT_REQUEST_THREADS
-        q = Queue(concurrent * 2)
+        names = list(self.lists.keys()) if names is None else list(names)
+        deadline = Deadline.of(deadline)
+        q = Queue()
+        done = Queue(concurrent * 2)
 
-        def populate():
+        def worker():
             while True:
                 name = q.get()
-                self.lists[name].update()  # Update the MailingList
-                q.task_done()
+
+                if name is None:
+                    break
+
+                try:
+                    deadline.check()
+                    func(self.lists[name])
+                    done.put((name, True))
+                except OperationCancelled:
+                    done.put((name, False))
+                except Exception as err:
+                    print("List '{}' failed: {}".format(name, err),
+                          file=stderr)
+                    done.put((name, False))
+
+        for name in names:
+            q.put(name)
 
         for i in range(concurrent):
-            t = Thread(target=populate)
+            q.put(None)  # One stop signal per worker, after all of the names
+            t = Thread(target=worker)
             t.daemon = True
             t.start()
 
-        for name, l in self.lists.items():
-            q.put(name)
+        for i in range(len(names)):
+            yield (done.get())
+
+    def __populate_all_lists(self, force=False, deadline=None):
+        # Populate all lists using concurrent requests, returning the names of
+        # the lists populated before the deadline
+        update = (lambda l: l.update(force, deadline=deadline))
+        populated = []
 
-        q.join()
+        for name, succeeded in self.__each_list(update, deadline=deadline):
+            if succeeded:
+                populated += [name]
 
-    def __populate_all(self, page):
+        return (populated)
+
+    def __populate_all(self, page, force=False, deadline=None):
         # Get list names, then populate all lists
         self.__get_list_names(page)
-        self.__populate_all_lists()
+        return (self.__populate_all_lists(force, deadline))
 
     def __get_list_names(self, page):
         # Get the names of lists from the sidebar 'list of lists'
         root = self.get_page_root(page)
         links = self.LISTS_XPATH(root)
         names = (link.rsplit('/', 1)[1] for link in links)
-        self.lists = {}
+        lists = {}
 
         for name in names:
-            self.lists[name] = MailingList(self, name)
+            # Keep the lists that are already known, along with their data
+            lists[name] = self.lists.get(name) or MailingList(self, name)
+
+        self.lists = lists
+
+    def __request(self, method, *args, deadline=None, **kwargs):
+        # Send a request, through the shared scheduler if there is one. The
+        # request times out no later than the deadline; while it is queued in
+        # the scheduler, passing the deadline (or cancelling) withdraws it
+        deadline = Deadline.of(deadline)
+        kwargs['timeout'] = deadline.timeout(self.REQUEST_TIMEOUT)
+
+        try:
+            return (self.__send(method, args, kwargs, deadline))
+        except (Timeout, RequestConnectionError) as err:
+            if deadline.done:  # Timed out because the deadline passed
+                raise OperationCancelled(
+                    "Operation deadline exceeded: {}".format(err)) from err
+            raise
 
-    def get_page(self, *args):
+    def __send(self, method, args, kwargs, deadline):
+        # Send a request directly, or through the scheduler until the
+        # deadline passes
+        if not self.scheduler:
+            return (method(*args, **kwargs))
+
+        future = self.scheduler.submit(self.host, method, *args, **kwargs)
+
+        while True:
+            try:
+                return (future.result(timeout=self.CANCEL_POLL))
+            except TimeoutError:
+                if deadline.done:
+                    future.cancel()  # Only if it has not started yet
+                    deadline.check()
+
+    def get_page(self, *args, deadline=None):
         """
         Get a page using the current session and sympa url, where args
         signify parts of a uri to be appended
         :param args: list<str>: / split parts of a uri to be appended to url
+        :param deadline: Deadline: the deadline of the operation
         :return: response: The results of the get request (the page)
+        :raises OperationCancelled: if the deadline passed or was cancelled
         """
         uri = '{0}/{1}'.format(self.url, '/'.join(args))
-        return (self.session.get(uri))
+        return (self.__request(self.transport.get, uri, deadline=deadline))
+
+    def get_landing_page(self, deadline=None):
+        """
+        Get the sympa landing page. Callers getting it at the same time share
+        one request, rather than each sending their own
+        :param deadline: Deadline: the deadline of the operation
+        :return: response: the landing page
+        :raises OperationCancelled: if the deadline passed or was cancelled
+        """
+        deadline = Deadline.of(deadline)
+        return (self._flight.do('landing',
+                                lambda: self.get_page(deadline=deadline),
+                                deadline))
 
     def get_page_root(self, page):
         """
@@ -84,64 +224,334 @@ class Sympa:
         """
         return (etree.HTML(page.content))
 
-    def post(self, **kwargs):
+    def post(self, deadline=None, **kwargs):
         """
         Send a post request using the current session
+        :param deadline: Deadline: the deadline of the operation
         :param kwargs: dict: request data to be sent
         :return:
+        :raises OperationCancelled: if the deadline passed or was cancelled
         """
-        page = self.session.post(url=self.url, data=kwargs)
+        page = self.__request(self.transport.post, url=self.url, data=kwargs,
+                              deadline=deadline)
         return (page)
 
-    def populate_list(self, list_name):
+    def populate_list(self, list_name, deadline=None, cancel=None):
         """
         Populate a single MailingList object by calling its update method
         :param list_name: str: the name of the list to update
+        :param deadline: float or Deadline: seconds allowed for the operation
+        :param cancel: CancellationToken: cancels the operation
         :return:
+        :raises OperationCancelled: if the deadline passed or was cancelled
         """
-        self.lists[list_name].update()
+        self.lists[list_name].update(deadline=deadline, cancel=cancel)
 
-    def populate_all(self):
+    def populate_all(self, force=False, deadline=None, cancel=None):
         """
         Populate all lists by calling their update methods
-        :return:
+        :param force: bool: update lists even if they are not out of date
+        :param deadline: float or Deadline: seconds allowed for the operation;
+        lists not populated in time are left as they were
+        :param cancel: CancellationToken: cancels the operation
+        :return: list<str>: the names of the lists that were populated
         """
-        page = self.get_page()
+        deadline = Deadline.of(deadline, cancel)
+
+        try:
+            page = self.get_landing_page(deadline)
+        except OperationCancelled:  # Nothing populated in time
+            return ([])
+
         if self.__logged_in(page):
-            self.__populate_all(page)
+            return (self.__populate_all(page, force, deadline))
         else:
             print("Cannot populate lists, not logged in!", file=stderr)
 
-    def logged_in(self):
+        return ([])
+
+    def populate_bouncing(self, deadline=None, cancel=None):
+        """
+        Populate the bouncing information of all lists, fetching only their
+        review bouncing pages
+        :param deadline: float or Deadline: seconds allowed for the operation
+        :param cancel: CancellationToken: cancels the operation
+        :return: list<str>: the names of the lists that were populated
+        """
+        deadline = Deadline.of(deadline, cancel)
+        refresh = (lambda l: l.refresh_bouncing(deadline))
+        populated = []
+
+        for name, succeeded in self.__each_list(refresh, deadline=deadline):
+            if succeeded:
+                populated += [name]
+
+        return (populated)
+
+    def query(self, list_names=None, deadline=None, cancel=None, **filters):
+        """
+        Find subscribers across lists, using the indexes of each list. Lists
+        that are out of date are first updated concurrently
+        :param list_names: list<str>: the lists to search, by default all
+        :param deadline: float or Deadline: seconds allowed for updating the
+        lists; lists that could not be updated in time are left out
+        :param cancel: CancellationToken: cancels the operation
+        :param filters: dict: the filters, order_by, reverse and limit of
+        MailingList.query
+        :return: list<Subscriber>: the matching subscribers of all lists, in
+        the requested order
+        """
+        order_by = filters.get('order_by')
+        names = list(self.lists.keys()) if list_names is None else list_names
+        deadline = Deadline.of(deadline, cancel)
+        update = (lambda l: l.update(deadline=deadline))
+        updated = []
+        results = []
+
+        for name, succeeded in self.__each_list(update, names, deadline):
+            if succeeded:
+                updated += [name]
+
+        for name in names:
+            if name not in updated and deadline.done:  # Not updated in time
+                continue
+
+            found = self.lists[name].query(deadline=deadline, **filters)
+            if found:  # None if not an administrator of the list
+                results += [found]
+
+        if order_by:  # Each list's results are already in order, merge them
+            def key(subscriber):
+                # The same order each list sorted its results in
+                value = getattr(subscriber, order_by)
+
+                if order_by == 'email':
+                    return (self.normalizer.normalize(value))
+
+                return (float(value) if order_by == 'bounce_score' else value)
+
+            found = merge(*results, key=key,
+                          reverse=filters.get('reverse', False))
+        else:
+            found = chain(*results)
+
+        return (list(islice(found, filters.get('limit'))))
+
+    def resume(self, journal, deadline=None, cancel=None):
+        """
+        Resume every interrupted bulk operation recorded in a journal,
+        sending only the requests that were never acknowledged
+        :param journal: str or OperationJournal: the journal
+        :param deadline: float or Deadline: seconds allowed for the operation
+        :param cancel: CancellationToken: cancels the operation
+        :return: list<BulkResult>: the result of each resumed operation
+        """
+        if type(journal) is str:
+            journal = OperationJournal(journal)
+
+        deadline = Deadline.of(deadline, cancel)
+        names = {operation['list'] for operation in journal.pending()}
+        results = []
+
+        for name in names:
+            if name in self.lists:  # None if not an administrator of it
+                results += self.lists[name].resume(journal,
+                                                   deadline=deadline) or []
+            else:
+                print("Cannot resume, no list '{}'".format(name), file=stderr)
+
+        return (results)
+
+    @contextmanager
+    def batch(self, max_size=100, max_delay=None, list_names=None,
+              journal=None, deadline=None, cancel=None):
+        """
+        Buffer add_subscriber and remove_subscriber calls on lists, sending
+        each list's calls as a few consolidated requests on exit, with the
+        lists sent concurrently; see MailingList.batch. If the with block
+        raises, calls not yet sent are discarded
+            with sympa.batch():
+                for name, email in joined:
+                    sympa.lists[name].add_subscriber(email)
+        :param max_size: int: send a list's calls once this many addresses
+        are buffered
+        :param max_delay: float: send a list's calls this many seconds after
+        its first buffered call, or only on size and exit if None
+        :param list_names: list<str>: the lists to batch, by default all
+        :param journal: str or OperationJournal: record each send here, so
+        that it can be resumed if interrupted
+        :param deadline: float or Deadline: seconds allowed for the batch
+        :param cancel: CancellationToken: cancels the batch
+        :return: dict<str, WriteBatch>: the batch of each list
+        :raises BatchFlushError: if sending the batches of some lists failed
+        """
+        names = list(self.lists.keys()) if list_names is None else list_names
+        deadline = Deadline.of(deadline, cancel)
+        batches = {}
+
+        with ExitStack() as stack:
+            for name in names:
+                batch = self.lists[name].batch(max_size, max_delay, journal,
+                                               deadline)
+                batches[name] = stack.enter_context(batch)
+
+            yield (batches)  # Should the body raise, the batches discard
+
+            # Send every list concurrently, leaving nothing for the batches
+            # to send as they exit
+            errors = {}
+
+            def flush(mailing_list):
+                try:
+                    batches[mailing_list.name].flush()
+                except Exception as err:
+                    errors[mailing_list.name] = err
+                    raise
+
+            for name, succeeded in self.__each_list(flush, names):
+                pass
+
+            if errors:  # Failed lists keep their calls, which are discarded
+                raise BatchFlushError(errors)
+
+    def watch(self, min_interval=60, max_interval=3600,
+              requests_per_minute=30, list_names=None):
+        """
+        Watch lists for subscriber changes, refreshing each list adaptively
+        from how often it changes, within a global budget of requests
+            for event in sympa.watch():  # or: async for event in ...
+                print(event.kind, event.list_name, event.email)
+        :param min_interval: float: fewest seconds between refreshes of a list
+        :param max_interval: float: most seconds between refreshes of a list
+        :param requests_per_minute: float: budget of requests to the server
+        :param list_names: list<str>: the lists to watch, by default all
+        :return: Watcher: iterable and async iterable of ChangeEvent
+        """
+        return (Watcher(self, min_interval, max_interval, requests_per_minute,
+                        list_names))
+
+    def export(self, path, format='csv', compress=None, shard=False,
+               retain=False, deadline=None, cancel=None):
+        """
+        Export every field of every subscriber of all lists, fetching lists
+        concurrently and writing each list's records as soon as it is parsed
+        :param path: str: output file, or output directory if sharding
+        :param format: str: 'csv' or 'jsonl'
+        :param compress: bool: gzip the output, by default when the path ends
+        with '.gz'
+        :param shard: bool: write one file per list into the path directory
+        :param retain: bool: keep each list's subscribers after writing them,
+        which holds every list in memory at once; by default, the parsed data
+        for each list is released once written, and fetched again when next
+        needed
+        :param deadline: float or Deadline: seconds allowed for the export;
+        lists not fetched in time are left out
+        :param cancel: CancellationToken: cancels the export
+        :return: list<str>: the names of the lists that were exported
+        :raises ValueError: if the format is not supported
+        """
+        # Check the format before creating anything or starting any fetch,
+        # as shards are only opened once their list has been fetched
+        if format not in RecordWriter.FORMATS:
+            raise ValueError("Unknown export format '{}', expected one of "
+                             "{}".format(format, RecordWriter.FORMATS))
+
+        deadline = Deadline.of(deadline, cancel)
+        update = (lambda l: l.update(deadline=deadline))
+        exported = []
+        writer = None
+
+        if shard:
+            makedirs(path, exist_ok=True)
+        else:
+            writer = RecordWriter(path, format, compress)
+
+        try:
+            for name, succeeded in self.__each_list(update,
+                                                    deadline=deadline):
+                mailing_list = self.lists[name]
+
+                if not succeeded:
+                    continue
+
+                if not mailing_list._admin:
+                    print(MailingList_Meta.AUTHMSG.format(name), file=stderr)
+                    continue
+
+                if shard:
+                    extension = '.gz' if compress else ''
+                    filename = join(path, '{}.{}{}'.format(name, format,
+                                                           extension))
+                    with RecordWriter(filename, format, compress) as shard_w:
+                        self.__write_list(mailing_list, shard_w)
+                else:
+                    self.__write_list(mailing_list, writer)
+
+                if not retain:
+                    mailing_list.clear()
+
+                exported += [name]
+        finally:
+            if writer:
+                writer.close()
+
+        return (exported)
+
+    def __write_list(self, mailing_list, writer):
+        # Write the records of each subscriber of a list
+        for subscriber in list(mailing_list._subscribers.values()):
+            writer.write(subscriber.to_record())
+
+    def logged_in(self, deadline=None, cancel=None):
         """
         Check if currently logged in
+        :param deadline: float or Deadline: seconds allowed for the check
+        :param cancel: CancellationToken: cancels the check
         :return: bool: whether or not the current session is logged in
+        :raises OperationCancelled: if the deadline passed or was cancelled
         """
-        return (self.__logged_in(self.get_page()))
+        deadline = Deadline.of(deadline, cancel)
+        return (self.__logged_in(self.get_landing_page(deadline)))
 
-    def log_in(self, email, password, populate=False):
+    def log_in(self, email, password, populate=False, deadline=None,
+               cancel=None):
         """
         Log in using email and password, optionally, populate all lists
         :param email: str: the log in email address for sympa
         :param password: str: the password for the log in email address
         :param populate: bool: whether or not to populate all lists on log in
+        :param deadline: float or Deadline: seconds allowed for the operation
+        :param cancel: CancellationToken: cancels the operation
         :return:
+        :raises OperationCancelled: if the deadline passed or was cancelled
+        before logging in
         """
+        deadline = Deadline.of(deadline, cancel)
+
+        if self.session_store and self.resume_session(email, deadline):
+            if populate:
+                self.__populate_all_lists(deadline=deadline)
+            return
+
         # Post login action, using the following data:
         login_request = {'action': 'login',
                          'email': '{}'.format(email),
                          'passwd': '{}'.format(password)}
-        login = self.post(**login_request)
+        login = self.post(deadline=deadline, **login_request)
 
         if not self.__logged_in(login):
             print('Unable to log in...', file=stderr)
         else:
             # Get the list names regardless of population
+            self.email = email
             self.__get_list_names(login)
 
+            if self.session_store:
+                self.save_session()
+
             if populate:
                 # populate all lists for this user
-                self.__populate_all_lists()
+                self.__populate_all_lists(deadline=deadline)
 
     def log_out(self):
         """
@@ -150,9 +560,57 @@ class Sympa:
         """
         self.post(action='logout')
 
+        if self.session_store:  # The stored session is no longer valid
+            self.session_store.clear()
+
+    def resume_session(self, email=None, deadline=None):
+        """
+        Resume the session kept in the session store, checking that it is
+        still logged in with a single request
+        :param email: str: the user the session must belong to, if given
+        :param deadline: float or Deadline: seconds allowed for the check
+        :return: bool: whether or not the stored session was resumed
+        :raises OperationCancelled: if the deadline passed or was cancelled
+        """
+        deadline = Deadline.of(deadline)
+        stored = self.session_store.load(self.url, email)
+
+        if not stored:
+            return (False)
+
+        # Check the stored cookies before the session takes them, so that a
+        # failed check leaves it as it was. Not coalesced: a landing page
+        # fetch already in flight would not send them
+        cookies = RequestsCookieJar()
+        self.session_store.restore_cookies(stored, cookies)
+        page = self.__request(self.transport.get, '{0}/'.format(self.url),
+                              cookies=cookies, deadline=deadline)
+
+        if not self.__logged_in(page):  # Expired, must log in
+            self.session_store.clear()
+            return (False)
+
+        self.session.cookies.update(cookies)
+        self.email = stored['email']
+        self.lists = {}
+
+        for name in stored['lists']:
+            self.lists[name] = MailingList(self, name)
+
+        return (True)
+
+    def save_session(self):
+        """
+        Save the current session and list names to the session store
+        :return:
+        """
+        self.session_store.save(self.url, self.email, self.session.cookies,
+                                self.lists.keys())
+
     def close(self):
         """
         Close the connection of the current session
         :return:
         """
         self.post(body={}, headers={'Connection': 'close'})
+        self.transport.close()
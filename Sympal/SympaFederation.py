@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from sys import stderr
+
+from Sympal.HostScheduler import HostScheduler
+from Sympal.Sympa import Sympa
+
+
+class SympaFederation:
+    # Operations that may run at once, across all servers; their requests
+    # are further limited by the scheduler
+    MAX_OPERATIONS = 16
+
+    def __enter__(self):
+        return (self)
+
+    def __init__(self, max_workers=8, per_host=4, max_operations=None):
+        """
+        Several logged in Sympa servers, whose requests all share one
+        HostScheduler: at most max_workers requests are in flight in total,
+        at most per_host to any one server, and servers are served in turn
+        so a large job on one does not starve quick queries on another
+        :param max_workers: int: requests in flight, across all servers
+        :param per_host: int: default requests in flight to any one server
+        :param max_operations: int: list operations that may run at once
+        """
+        self.scheduler = HostScheduler(max_workers, per_host)
+        self.operations = ThreadPoolExecutor(
+            max_operations or self.MAX_OPERATIONS)
+        self.servers = {}
+
+    def __exit__(self, ex_type, ex_val, traceback):
+        self.close()
+
+    def __getitem__(self, server):
+        return (self.servers[server])
+
+    def add(self, url, email, password, server=None, per_host=None,
+            **kwargs):
+        """
+        Log in to a server and add it to the federation
+        :param url: str: the sympa url of the server
+        :param email: str: the log in email address for the server
+        :param password: str: the password for the log in email address
+        :param server: str: the name of the server, by default its host
+        :param per_host: int: requests in flight to this server, if not the
+        federation default
+        :param kwargs: dict: further arguments for Sympa
+        :return: Sympa: the logged in server
+        """
+        sympa = Sympa(url, scheduler=self.scheduler, **kwargs)
+        server = server or sympa.host
+
+        if per_host:
+            self.scheduler.set_limit(sympa.host, per_host)
+
+        sympa.log_in(email, password)
+        self.servers[server] = sympa
+        return (sympa)
+
+    @property
+    def lists(self):
+        """
+        All lists of all servers
+        :return: dict<MailingList>: (server, list name): MailingList pairs
+        """
+        return ({(server, name): mailing_list
+                 for server, sympa in self.servers.items()
+                 for name, mailing_list in sympa.lists.items()})
+
+    def get_list(self, server, list_name):
+        """
+        :param server: str: the name of the server
+        :param list_name: str: the name of the list on that server
+        :return: MailingList: the list
+        """
+        return (self.servers[server].lists[list_name])
+
+    def submit(self, server, list_name, method, *args, **kwargs):
+        """
+        Run a method of a list in the background, e.g.
+            federation.submit('lists.a.edu', 'staff', 'set_subscribers', path)
+        :param server: str: the name of the server
+        :param list_name: str: the name of the list on that server
+        :param method: str: the name of the MailingList method
+        :return: Future: the result of the method
+        """
+        mailing_list = self.get_list(server, list_name)
+        return (self.operations.submit(getattr(mailing_list, method), *args,
+                                       **kwargs))
+
+    def __each_server(self, method, *args, **kwargs):
+        # Run a method of every server concurrently, wait for all of them
+        futures = {server: self.operations.submit(getattr(sympa, method),
+                                                  *args, **kwargs)
+                   for server, sympa in self.servers.items()}
+        wait(futures.values())
+        results = {}
+
+        for server, future in futures.items():
+            if future.exception():
+                print("Server '{}' failed: {}".format(server,
+                                                      future.exception()),
+                      file=stderr)
+            else:
+                results[server] = future.result()
+
+        return (results)
+
+    def populate_all(self, force=False):
+        """
+        Populate all lists of all servers
+        :param force: bool: update lists even if they are not out of date
+        :return:
+        """
+        self.__each_server('populate_all', force)
+
+    def populate_bouncing(self):
+        """
+        Populate the bouncing information of all lists of all servers
+        :return:
+        """
+        self.__each_server('populate_bouncing')
+
+    def query(self, **filters):
+        """
+        Find subscribers on every server
+        :param filters: dict: arguments of Sympa.query
+        :return: dict<list<Subscriber>>: server: matching subscribers pairs
+        """
+        return (self.__each_server('query', **filters))
+
+    def close(self):
+        """
+        Log out of, or keep the sessions of, every server, then stop the
+        shared workers
+        :return:
+        """
+        self.operations.shutdown()
+
+        for sympa in self.servers.values():
+            sympa.__exit__(None, None, None)
+
+        self.scheduler.shutdown()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+from json import dumps
+from json import loads
+from socket import AF_UNIX
+from socket import SOCK_STREAM
+from socket import socket
+
+from Sympal.SympalDaemon import SympalDaemon
+
+
+class SympalClientError(Exception):
+    # An error reported by the daemon for a request
+    pass
+
+
+class SympalClient:
+    def __enter__(self):
+        return (self)
+
+    def __init__(self, socket_path=None):
+        """
+        A thin client for a running SympalDaemon
+        :param socket_path: str: the Unix domain socket of the daemon
+        """
+        self.socket_path = socket_path or SympalDaemon.DEFAULT_SOCKET
+        self.socket = socket(AF_UNIX, SOCK_STREAM)
+        self.socket.connect(self.socket_path)
+        self.f_h = self.socket.makefile('rwb')
+
+    def __exit__(self, ex_type, ex_val, traceback):
+        self.close()
+
+    def call(self, method, **params):
+        """
+        Send a request to the daemon and wait for its response
+        :param method: str: the daemon method to call
+        :param params: dict: the parameters of the method
+        :return: obj: the result of the method
+        """
+        request = {'method': method, 'params': params}
+        self.f_h.write(dumps(request).encode() + b'\n')
+        self.f_h.flush()
+        line = self.f_h.readline()
+
+        if not line:
+            raise SympalClientError("Daemon closed the connection")
+
+        response = loads(line.decode())
+
+        if 'error' in response:
+            raise SympalClientError(response['error'])
+
+        return (response['result'])
+
+    def ping(self):
+        return (self.call('ping'))
+
+    def lists(self):
+        """
+        :return: list<str>: the names of the lists of the daemon user
+        """
+        return (self.call('lists'))
+
+    def subscribers(self, list_name):
+        """
+        :param list_name: str: the name of the list
+        :return: list<dict>: a record for each subscriber of the list
+        """
+        return (self.call('subscribers', list_name=list_name))
+
+    def bouncing(self, list_name):
+        """
+        :param list_name: str: the name of the list
+        :return: list<dict>: a record for each bouncing subscriber of the list
+        """
+        return (self.call('bouncing', list_name=list_name))
+
+    def refresh(self, list_name=None):
+        """
+        Refresh a list (all lists by default) now, instead of waiting for the
+        next background refresh
+        :param list_name: str: the name of the list
+        :return:
+        """
+        return (self.call('refresh', list_name=list_name))
+
+    def set_subscribers(self, list_name, subscribers):
+        """
+        :param list_name: str: the name of the list
+        :param subscribers: list: of str 'email name', or [email, name] pairs
+        :return: dict: the BulkResult record: accepted and remaining requests,
+        verified and complete
+        """
+        return (self.call('set_subscribers', list_name=list_name,
+                          subscribers=list(subscribers)))
+
+    def add_subscriber(self, list_name, email, real_name=""):
+        return (self.call('add_subscriber', list_name=list_name, email=email,
+                          real_name=real_name))
+
+    def remove_subscriber(self, list_name, email):
+        return (self.call('remove_subscriber', list_name=list_name,
+                          email=email))
+
+    def reset_bouncing(self, list_name):
+        """
+        :param list_name: str: the name of the list
+        :return: dict: the BulkResult record, as for set_subscribers
+        """
+        return (self.call('reset_bouncing', list_name=list_name))
+
+    def reset_bouncing_subscriber(self, list_name, email):
+        return (self.call('reset_bouncing_subscriber', list_name=list_name,
+                          email=email))
+
+    def remove_bouncing_subscribers(self, list_name):
+        """
+        :param list_name: str: the name of the list
+        :return: dict: the BulkResult record, as for set_subscribers
+        """
+        return (self.call('remove_bouncing_subscribers', list_name=list_name))
+
+    def shutdown(self):
+        """
+        Stop the daemon
+        :return:
+        """
+        return (self.call('shutdown'))
+
+    def close(self):
+        """
+        Close the connection to the daemon
+        :return:
+        """
+        self.f_h.close()
+        self.socket.close()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+from json import dumps
+from json import loads
+from os import chmod
+from os import environ
+from os import remove
+from os.path import exists
+from os.path import expanduser
+from socketserver import StreamRequestHandler
+from socketserver import ThreadingUnixStreamServer
+from sys import stderr
+from threading import Event
+from threading import Thread
+
+from Sympal.MailingList import MailingList
+
+
+class UnknownListError(LookupError):
+    # Raised for a request naming a list the daemon user does not have
+    pass
+
+
+class SympalDaemon:
+    # Where the daemon listens, unless told otherwise
+    DEFAULT_SOCKET = environ.get('SYMPAL_SOCKET',
+                                 expanduser('~/.sympal.sock'))
+    # How frequently the lists are refreshed in the background, in minutes --
+    # just under the age at which a MailingList refreshes itself on access,
+    # so that queries are always answered from the warm cache
+    REFRESH_MINS = MailingList.UPDATE_MINS - 1
+
+    def __init__(self, sympa, socket_path=None, refresh_mins=None):
+        """
+        Serve queries and bulk operations on the lists of a logged in Sympa
+        instance over a Unix domain socket, keeping every list warm with
+        background refreshes. Requests and responses are single lines of JSON:
+        {"method": name, "params": {...}} -> {"result": ...} or {"error": msg}
+        :param sympa: Sympa: a logged in Sympa instance
+        :param socket_path: str: the Unix domain socket to listen on
+        :param refresh_mins: float: minutes between background refreshes
+        """
+        self.sympa = sympa
+        self.socket_path = socket_path or self.DEFAULT_SOCKET
+        self.refresh_mins = refresh_mins or self.REFRESH_MINS
+        self.server = None
+        self._stop = Event()
+        self.methods = {'ping': self.ping,
+                        'lists': self.lists,
+                        'subscribers': self.subscribers,
+                        'bouncing': self.bouncing,
+                        'refresh': self.refresh,
+                        'set_subscribers': self.set_subscribers,
+                        'add_subscriber': self.add_subscriber,
+                        'remove_subscriber': self.remove_subscriber,
+                        'reset_bouncing': self.reset_bouncing,
+                        'reset_bouncing_subscriber':
+                            self.reset_bouncing_subscriber,
+                        'remove_bouncing_subscribers':
+                            self.remove_bouncing_subscribers,
+                        'shutdown': self.shutdown}
+
+    def serve_forever(self):
+        """
+        Populate all lists, then serve requests until shut down
+        :return:
+        """
+        daemon = self
+
+        class Handler(StreamRequestHandler):
+            def handle(self):
+                # One JSON request per line, until the client disconnects
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+
+                    response = daemon.handle(line)
+                    self.wfile.write(dumps(response).encode() + b'\n')
+                    self.wfile.flush()
+
+        if exists(self.socket_path):  # Left behind by an unclean exit
+            remove(self.socket_path)
+
+        self.sympa.populate_all()
+        self.server = ThreadingUnixStreamServer(self.socket_path, Handler)
+        self.server.daemon_threads = True
+        chmod(self.socket_path, 0o600)  # Only this user may use the session
+
+        refresher = Thread(target=self.__refresh_periodically)
+        refresher.daemon = True
+        refresher.start()
+
+        try:
+            self.server.serve_forever()
+        finally:
+            self._stop.set()
+            self.server.server_close()
+            remove(self.socket_path)
+
+    def __refresh_periodically(self):
+        # Refresh all lists in the background until stopped
+        while not self._stop.wait(self.refresh_mins * 60):
+            try:
+                self.sympa.populate_all(force=True)
+            except Exception as err:
+                print("Background refresh failed: {}".format(err), file=stderr)
+
+    def handle(self, line):
+        """
+        Handle a single request
+        :param line: bytes: a JSON request
+        :return: dict: the response
+        """
+        try:
+            request = loads(line.decode())
+            method = self.methods[request['method']]
+        except KeyError as err:
+            return ({'error': 'Unknown method: {}'.format(err)})
+        except Exception as err:
+            return ({'error': '{}: {}'.format(type(err).__name__, err)})
+
+        try:
+            return ({'result': method(**request.get('params', {}))})
+        except UnknownListError as err:
+            return ({'error': 'Unknown list: {}'.format(err)})
+        except Exception as err:
+            return ({'error': '{}: {}'.format(type(err).__name__, err)})
+
+    def __list(self, list_name):
+        # The named list, without mistaking a KeyError raised inside a list
+        # method for an unknown list
+        if list_name not in self.sympa.lists:
+            raise UnknownListError(repr(list_name))
+
+        return (self.sympa.lists[list_name])
+
+    def __result(self, result):
+        # Plain record of the BulkResult of a bulk operation, so that clients
+        # can tell a partial run from a complete one
+        if result is None:  # Not an administrator of the list
+            return (None)
+
+        return (result.to_record())
+
+    def __records(self, subscribers):
+        # Plain records for a dictionary of subscribers
+        if subscribers is None:  # Not an administrator of the list
+            return (None)
+
+        return ([s.to_record() for s in list(subscribers.values())])
+
+    def ping(self):
+        return ('pong')
+
+    def lists(self):
+        return (list(self.sympa.lists.keys()))
+
+    def subscribers(self, list_name):
+        return (self.__records(self.__list(list_name).get_subscribers()))
+
+    def bouncing(self, list_name):
+        return (self.__records(self.__list(list_name).get_bouncing()))
+
+    def refresh(self, list_name=None):
+        if list_name is None:
+            self.sympa.populate_all(force=True)
+        else:
+            self.__list(list_name).update(force=True)
+
+    def set_subscribers(self, list_name, subscribers):
+        # JSON has no tuples, so [email, name] pairs arrive as lists
+        subscribers = [tuple(x) if type(x) is list else x
+                       for x in subscribers]
+        result = self.__list(list_name).set_subscribers(subscribers)
+        return (self.__result(result))
+
+    def add_subscriber(self, list_name, email, real_name=""):
+        self.__list(list_name).add_subscriber(email, real_name)
+
+    def remove_subscriber(self, list_name, email):
+        self.__list(list_name).remove_subscriber(email)
+
+    def reset_bouncing(self, list_name):
+        return (self.__result(self.__list(list_name).reset_bouncing()))
+
+    def reset_bouncing_subscriber(self, list_name, email):
+        self.__list(list_name).reset_bouncing_subscriber(email)
+
+    def remove_bouncing_subscribers(self, list_name):
+        result = self.__list(list_name).remove_bouncing_subscribers()
+        return (self.__result(result))
+
+    def shutdown(self):
+        # Shut down from another thread, as this one is serving the request
+        Thread(target=self.server.shutdown).start()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+from datetime import datetime
+from os.path import dirname
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import TestLoader
+from unittest import TextTestRunner
+
+from Sympal.Sympa import Sympa
+from Sympal.Transport import ReplayTransport
+
+
+class Test_Replay(TestCase):
+    # A small hand-made fixture of two lists, with the password scrubbed from
+    # its log in request -- runs without a server or network access
+    FIXTURE = join(dirname(__file__), 'fixtures', 'replay.jsonl.gz')
+    URL = 'https://lists.example.edu/sympa'
+
+    def setUp(self):
+        self.transport = ReplayTransport(self.FIXTURE)
+        self.sympa = Sympa(self.URL, transport=self.transport)
+
+    def test_log_in(self):
+        # Any password matches, as it was scrubbed when recorded
+        self.sympa.log_in('owner@example.edu', 'not the password')
+        self.assertEqual(self.sympa.email, 'owner@example.edu')
+        self.assertEqual(sorted(self.sympa.lists), ['news', 'staff'])
+
+    def test_populate_all(self):
+        self.assertEqual(sorted(self.sympa.populate_all()), ['news', 'staff'])
+
+        staff = self.sympa.lists['staff'].get_subscribers()
+        self.assertEqual(sorted(staff), ['ann@example.edu', 'bob@example.edu',
+                                         'carol@example.edu'])
+        self.assertEqual(staff['ann@example.edu'].name, 'Ann Author')
+        self.assertEqual(staff['ann@example.edu'].reception, 'mail')
+        self.assertEqual(staff['ann@example.edu'].sub_date,
+                         datetime(2020, 1, 1))
+        # Keyed by the normalized address, kept as the server has it
+        self.assertEqual(staff['carol@example.edu'].email,
+                         'Carol@Example.edu')
+
+        news = self.sympa.lists['news'].get_subscribers()
+        self.assertEqual(sorted(news), ['dan@example.edu', 'erin@example.edu'])
+        self.assertEqual(news['erin@example.edu'].name, '')
+
+    def test_bouncing(self):
+        self.sympa.populate_all()
+        bouncing = self.sympa.lists['staff'].get_bouncing()
+        self.assertEqual(list(bouncing), ['bob@example.edu'])
+        self.assertTrue(bouncing['bob@example.edu'].bouncing)
+        self.assertEqual(bouncing['bob@example.edu'].bounce_score, '12')
+        self.assertEqual(self.sympa.lists['news'].get_bouncing(), {})
+
+    def test_email_lists(self):
+        # Addresses as the server has them, ordered by their normalized forms
+        self.sympa.populate_all()
+        staff = self.sympa.lists['staff']
+        self.assertEqual(sorted(staff.get_subscribers_email_list()),
+                         ['Carol@Example.edu', 'ann@example.edu',
+                          'bob@example.edu'])
+        self.assertEqual(staff.get_bouncing_email_list(), ['bob@example.edu'])
+        found = self.sympa.query(order_by='email')
+        self.assertEqual([s.email for s in found],
+                         ['ann@example.edu', 'bob@example.edu',
+                          'Carol@Example.edu', 'dan@example.edu',
+                          'erin@example.edu'])
+
+    def test_batch(self):
+        # Buffered calls fetch nothing; the batch updates the list once as it
+        # sends, dropping calls the list already reflects
+        self.sympa.log_in('owner@example.edu', 'not the password')
+        staff = self.sympa.lists['staff']
+        gets = []
+        get = self.transport.get
+
+        def record(*args, **kwargs):
+            gets.append(args)
+            return (get(*args, **kwargs))
+
+        self.transport.get = record
+
+        with staff.batch() as batch:
+            for email in ['ann@example.edu', 'BOB@example.edu', 'Carol@x.edu',
+                          'carol@example.edu', 'dan@example.edu']:
+                staff.add_subscriber(email)
+
+            staff.remove_subscriber('Carol@x.edu')
+            staff.remove_subscriber('dan@example.edu')
+            self.assertEqual(gets, [])
+
+        self.assertEqual(len(gets), 2)  # The review and bouncing pages
+        self.assertTrue(batch.results[0].complete)
+
+    def test_repeatable(self):
+        self.sympa.populate_all()
+        first = {n: l.get_subscribers_email_list()
+                 for n, l in self.sympa.lists.items()}
+        self.transport.rewind()
+        self.sympa.populate_all(force=True)
+        again = {n: l.get_subscribers_email_list()
+                 for n, l in self.sympa.lists.items()}
+        self.assertEqual(first, again)
+
+    def test_missing_roster(self):
+        # Neither a missing file nor missing columns may read as an empty
+        # roster, which would remove every subscriber
+        self.sympa.populate_all()
+        staff = self.sympa.lists['staff']
+        posts = []
+        post = self.transport.post
+
+        def record(*args, **kwargs):
+            posts.append(args)
+            return (post(*args, **kwargs))
+
+        self.transport.post = record
+
+        with TemporaryDirectory() as tmp:
+            missing = join(tmp, 'missing.txt')
+            self.assertRaises(FileNotFoundError, staff.set_subscribers,
+                              missing)
+
+            roster = join(tmp, 'roster.csv')
+            with open(roster, 'w') as f_h:
+                f_h.write("address,full name\nann@example.edu,Ann Author\n")
+
+            self.assertRaises(ValueError, staff.set_subscribers, roster,
+                              columns=('email', 'name'))
+
+        self.assertEqual(posts, [])
+        self.assertEqual(len(staff.get_subscribers()), 3)
+
+    def test_unrecorded(self):
+        self.assertRaises(LookupError, self.sympa.get_page, 'nothing')
+
+
+if __name__ == "__main__":
+    suite = TestLoader().loadTestsFromTestCase(Test_Replay)
+    TextTestRunner(verbosity=3).run(suite)
@@ -1,10 +1,22 @@
 #!/usr/bin/env python3
+from gzip import open as gzip_open
+from json import loads
 from os import environ
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import sleep
 from unittest import TestCase
 from unittest import TestLoader
 from unittest import TextTestRunner
 
+from Sympal.Deadline import CancellationToken
+from Sympal.Deadline import OperationCancelled
+from Sympal.OperationJournal import OperationJournal
 from Sympal.Sympa import Sympa
+from Sympal.SympalClient import SympalClient
+from Sympal.SympalDaemon import SympalDaemon
+from Sympal.Transport import RecordingTransport
+from Sympal.Transport import ReplayTransport
 
 
 class Test_Sympa_MailingList(TestCase):
@@ -34,6 +46,15 @@ class Test_Sympa_MailingList(TestCase):
             if bouncing:
                 print(bouncing)
 
+    def test_query(self):
+        for name, l in self.sympa.lists.items():
+            print("Top bouncing for list '{}'".format(name))
+            print(l.top_bouncing(5))
+            print(l.query(bouncing=True, order_by='sub_date', limit=5))
+
+        print(self.sympa.query(min_bounce_score=50, order_by='bounce_score',
+                               reverse=True, limit=10))
+
     def test_get_subscribers_email_list(self):
         for name, l in self.sympa.lists.items():
             print("Subscribers email list for '{}'".format(name))
@@ -64,6 +85,172 @@ class Test_Sympa_MailingList(TestCase):
         email_list = environ["test_email_list"]
         self.sympa.lists[environ['default_list']].set_subscribers(email_list)
 
+    def test_set_subscribers_normalized(self):
+        mailing_list = self.sympa.lists[environ['default_list']]
+        mailing_list.set_subscribers(environ["test_email_list"])
+        # The same roster again, in a different case and duplicated, should
+        # need no changes at all
+        with open(environ["test_email_list"]) as f_h:
+            roster = [line.upper() for line in f_h] * 2
+
+        before = dict(mailing_list.get_subscribers())
+        mailing_list.set_subscribers(roster)
+        self.assertEqual(before.keys(), mailing_list.get_subscribers().keys())
+
+    def test_set_subscribers_journal(self):
+        with TemporaryDirectory() as tmp:
+            journal = OperationJournal(tmp + '/journal.jsonl')
+            mailing_list = self.sympa.lists[environ['default_list']]
+            mailing_list.set_subscribers(environ["test_email_list"],
+                                         journal=journal)
+            self.sympa.resume(journal)
+            self.assertEqual(journal.pending(), [])
+
+    def test_deadline(self):
+        mailing_list = self.sympa.lists[environ['default_list']]
+        result = mailing_list.set_subscribers(environ["test_email_list"],
+                                              deadline=60)
+        print(result)
+        self.assertEqual(result.complete, not result.remaining)
+
+        cancel = CancellationToken()
+        cancel.cancel()
+        self.assertEqual(self.sympa.populate_all(force=True, cancel=cancel),
+                         [])
+        self.assertRaises(OperationCancelled, self.sympa.logged_in,
+                          cancel=cancel)
+
+    def test_concurrent_update(self):
+        mailing_list = self.sympa.lists[environ['default_list']]
+        mailing_list.clear()
+        found = []
+
+        def get_subscribers():
+            found.append(len(mailing_list.get_subscribers()))
+
+        threads = [Thread(target=get_subscribers) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(set(found)), 1)
+
+    def test_batch(self):
+        mailing_list = self.sympa.lists[environ['default_list']]
+        mailing_list.set_subscribers(environ["test_email_list"])
+        before = set(mailing_list.get_subscribers())
+        subscriber = "cacampbell@ucdavis.edu"
+
+        with mailing_list.batch() as batch:
+            mailing_list.add_subscriber(subscriber)
+            mailing_list.remove_subscriber(subscriber)
+            self.assertEqual(len(batch), 1)
+
+        self.assertEqual(batch.results, [])
+        self.assertEqual(before, set(mailing_list.get_subscribers()))
+
+    def test_set_subscribers_from_generator(self):
+        with open(environ["test_email_list"]) as f_h:
+            lines = (line for line in f_h)
+            self.sympa.lists[environ['default_list']].set_subscribers(lines)
+
+    def test_populate_bouncing(self):
+        populated = self.sympa.populate_bouncing()
+        self.assertEqual(sorted(populated), sorted(self.sympa.lists))
+
+        for name, l in self.sympa.lists.items():
+            for email, subscriber in (l.get_bouncing() or {}).items():
+                self.assertTrue(subscriber.bouncing)
+                self.assertIsInstance(subscriber.name, str)
+
+    def test_watch(self):
+        listname = environ['default_list']
+        subscriber = "cacampbell@ucdavis.edu"
+        self.sympa.lists[listname].remove_subscriber(subscriber)
+        watcher = self.sympa.watch(min_interval=1, max_interval=5,
+                                   list_names=[listname])
+
+        added = []
+
+        def change():
+            sleep(2)
+            self.sympa.lists[listname].add_subscriber(subscriber)
+            sleep(30)  # Give up, should the event never come
+            watcher.stop()
+
+        Thread(target=change, daemon=True).start()
+
+        for event in watcher:
+            if event.kind == watcher.ADDED and event.email == subscriber:
+                added += [event]
+                break
+
+        watcher.stop()
+        self.assertEqual([e.list_name for e in added], [listname])
+
+    def test_export(self):
+        with TemporaryDirectory() as tmp:
+            path = tmp + '/lists.jsonl.gz'
+            exported = self.sympa.export(path, 'jsonl')
+            self.assertTrue(exported)
+
+            with gzip_open(path, 'rt') as f_h:
+                records = [loads(line) for line in f_h]
+
+            self.assertTrue({r['list'] for r in records} <= set(exported))
+            self.assertTrue(all('@' in r['email'] for r in records))
+
+            for name in exported:
+                listed = [r['email'] for r in records if r['list'] == name]
+                subscribers = self.sympa.lists[name].get_subscribers()
+                emails = [s.email for s in subscribers.values()]
+                self.assertEqual(sorted(listed), sorted(emails))
+
+    def test_resume_session(self):
+        with TemporaryDirectory() as tmp:
+            store = tmp + '/session.json'
+            with Sympa(environ['sympa_url'], store, keep_session=True) as s:
+                s.log_in(environ['admin_email'], environ['admin_pass'])
+
+            resumed = Sympa(environ['sympa_url'], store)
+            self.assertTrue(resumed.resume_session(environ['admin_email']))
+            self.assertEqual(resumed.lists.keys(), self.sympa.lists.keys())
+            resumed.log_out()
+            resumed.close()
+
+    def test_daemon(self):
+        with TemporaryDirectory() as tmp:
+            daemon = SympalDaemon(self.sympa, tmp + '/sympal.sock')
+            server = Thread(target=daemon.serve_forever)
+            server.start()
+            sleep(1)
+
+            with SympalClient(daemon.socket_path) as client:
+                self.assertEqual(client.ping(), 'pong')
+                self.assertEqual(client.lists(), list(self.sympa.lists))
+                print(client.subscribers(environ['default_list']))
+                client.shutdown()
+
+            server.join()
+
+    def test_record_and_replay(self):
+        with TemporaryDirectory() as tmp:
+            fixture = tmp + '/fixture.jsonl.gz'
+            recorded = Sympa(environ['sympa_url'],
+                             transport=RecordingTransport(fixture))
+            with recorded:
+                recorded.log_in(environ['admin_email'], environ['admin_pass'])
+                recorded.populate_all()
+
+            replayed = Sympa(environ['sympa_url'],
+                             transport=ReplayTransport(fixture))
+            replayed.populate_all()
+
+            for name, l in recorded.lists.items():
+                self.assertEqual(l._subscribers.keys(),
+                                 replayed.lists[name]._subscribers.keys())
+
     def tearDown(self):
         self.sympa.log_out()
         self.sympa.close()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+from base64 import b64decode
+from base64 import b64encode
+from collections import deque
+from gzip import open as gzip_open
+from json import dumps
+from json import loads
+from threading import Lock
+
+import requests
+
+
+class Transport:
+    # Form fields that are never written to a fixture
+    SCRUBBED_FIELDS = ['passwd', 'password']
+
+    def __init__(self, session=None):
+        """
+        Sends the requests of a Sympa instance, using a requests session
+        :param session: Session: the session to use, by default a new one
+        """
+        self.session = session or requests.session()
+
+    def get(self, url, **kwargs):
+        """
+        :param url: str: the url to get
+        :param kwargs: dict: further arguments for requests
+        :return: response: the page
+        """
+        return (self.session.get(url, **kwargs))
+
+    def post(self, url, data=None, **kwargs):
+        """
+        :param url: str: the url to post to
+        :param data: dict: the form data to post
+        :param kwargs: dict: further arguments for requests
+        :return: response: the page
+        """
+        return (self.session.post(url, data=data, **kwargs))
+
+    def close(self):
+        """
+        Release anything held by the transport
+        :return:
+        """
+        pass
+
+    @classmethod
+    def scrub(cls, data):
+        """
+        Form data with credentials blanked out, as a canonical string
+        :param data: dict: form data
+        :return: str: the scrubbed data, as JSON with sorted keys
+        """
+        data = dict(data or {})
+
+        for key in cls.SCRUBBED_FIELDS:
+            if key in data:
+                data[key] = ''
+
+        return (dumps(data, sort_keys=True))
+
+
+class RecordingTransport(Transport):
+    # Headers that are never written to a fixture
+    SCRUBBED_HEADERS = ['set-cookie', 'cookie', 'authorization']
+
+    def __init__(self, path, session=None):
+        """
+        Send requests like Transport, also recording each request and its
+        response, with credentials and cookies scrubbed, to a gzipped fixture
+        file of JSON lines that a ReplayTransport can serve
+        :param path: str: the fixture file to write
+        :param session: Session: the session to use, by default a new one
+        """
+        super().__init__(session)
+        self.path = path
+        self.f_h = gzip_open(path, 'wt')
+        self._lock = Lock()
+
+    def __record(self, method, url, data, response):
+        # Write one interaction to the fixture
+        headers = {k: v for k, v in response.headers.items()
+                   if k.lower() not in self.SCRUBBED_HEADERS}
+        interaction = {'method': method,
+                       'url': url,
+                       'data': self.scrub(data),
+                       'status': response.status_code,
+                       'headers': headers,
+                       'encoding': response.encoding,
+                       'content': b64encode(response.content).decode()}
+
+        with self._lock:
+            print(dumps(interaction), file=self.f_h)
+
+        return (response)
+
+    def get(self, url, **kwargs):
+        return (self.__record('GET', url, None, super().get(url, **kwargs)))
+
+    def post(self, url, data=None, **kwargs):
+        response = super().post(url, data, **kwargs)
+        return (self.__record('POST', url, data, response))
+
+    def close(self):
+        with self._lock:
+            self.f_h.close()
+
+
+class ReplayResponse:
+    def __init__(self, interaction):
+        """
+        A recorded response, with the attributes of a requests response that
+        Sympal uses
+        :param interaction: dict: an interaction from a fixture
+        """
+        self.url = interaction['url']
+        self.status_code = interaction['status']
+        self.headers = interaction['headers']
+        self.encoding = interaction['encoding'] or 'utf-8'
+        self.content = b64decode(interaction['content'])
+
+    def __bool__(self):
+        return (self.ok)
+
+    @property
+    def ok(self):
+        return (self.status_code < 400)
+
+    @property
+    def text(self):
+        return (self.content.decode(self.encoding, errors='replace'))
+
+
+class ReplayTransport(Transport):
+    def __init__(self, path):
+        """
+        Serve the responses recorded by a RecordingTransport, without any
+        network access. Each distinct request gets its recorded responses in
+        the order they were recorded; once those run out, the last one is
+        served again, so that polling loops and repeated runs still work
+        :param path: str: the fixture file to read
+        """
+        super().__init__()
+        self.recorded = {}  # (method, url, data): list of ReplayResponse
+        self.responses = {}  # The same, as deques of those yet to be served
+        self._lock = Lock()
+
+        with gzip_open(path, 'rt') as f_h:
+            for line in f_h:
+                interaction = loads(line)
+                key = (interaction['method'], interaction['url'],
+                       interaction['data'])
+                self.recorded.setdefault(key, []).append(
+                    ReplayResponse(interaction))
+
+        self.rewind()
+
+    def rewind(self):
+        """
+        Serve every request from its first recorded response again, so that
+        repeated runs see exactly the same responses
+        :return:
+        """
+        with self._lock:
+            self.responses = {k: deque(v) for k, v in self.recorded.items()}
+
+    def __serve(self, method, url, data):
+        # The next recorded response for a request
+        key = (method, url, self.scrub(data))
+
+        with self._lock:
+            if key not in self.responses:
+                raise LookupError("No recorded response for {} {} {}".format(
+                    *key))
+
+            responses = self.responses[key]
+            return (responses.popleft() if len(responses) > 1
+                    else responses[0])
+
+    def get(self, url, **kwargs):
+        return (self.__serve('GET', url, None))
+
+    def post(self, url, data=None, **kwargs):
+        return (self.__serve('POST', url, data))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+from asyncio import get_running_loop
+from collections import namedtuple
+from heapq import heappop
+from heapq import heappush
+from sys import stderr
+from threading import Event
+from time import monotonic
+
+from Sympal.Subscriber import Subscriber
+
+# A change to one subscriber of one list. kind is one of Watcher.ADDED,
+# REMOVED, UPDATED or BOUNCE_CHANGED; changes maps each changed attribute to
+# its (old, new) values (empty for additions and removals)
+ChangeEvent = namedtuple('ChangeEvent', ['kind', 'list_name', 'email',
+                                         'subscriber', 'changes'])
+
+
+class Watcher:
+    # Kinds of change events
+    ADDED = 'added'
+    REMOVED = 'removed'
+    UPDATED = 'updated'
+    BOUNCE_CHANGED = 'bounce_changed'
+    # Attributes compared between refreshes, and the kind of event they raise
+    WATCHED = [(x, 'updated') for x in Subscriber.subscriber_info
+               if x not in ['email', 'picture', 'mailing_list']] + \
+              [(x, 'bounce_changed') for x in Subscriber.bouncing_info]
+    # Requests made by one refresh of a list (review and review bouncing)
+    REQUESTS_PER_REFRESH = 2
+    # Factors applied to a list's interval when it did, or did not, change
+    SPEEDUP = 0.5
+    SLOWDOWN = 1.5
+
+    def __init__(self, sympa, min_interval=60, max_interval=3600,
+                 requests_per_minute=30, list_names=None):
+        """
+        Watch lists for subscriber changes, refreshing each list at a rate
+        adapted to how often it changes: the interval of a list is shortened
+        when a refresh finds changes, and lengthened when it finds none. All
+        refreshes share a budget of requests per minute
+        :param sympa: Sympa: a logged in Sympa instance
+        :param min_interval: float: fewest seconds between refreshes of a list
+        :param max_interval: float: most seconds between refreshes of a list
+        :param requests_per_minute: float: budget of requests to the server
+        :param list_names: list<str>: the lists to watch, by default all
+        """
+        self.sympa = sympa
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.requests_per_minute = requests_per_minute
+        self.list_names = list_names
+        self.intervals = {}
+        self._stop = Event()
+
+    def __iter__(self):
+        """
+        Refresh lists as they come due, yielding a ChangeEvent for each change
+        found. The first refresh of each list only records its state
+        :return: generator<ChangeEvent>: change events, until stopped
+        """
+        names = self.list_names or list(self.sympa.lists.keys())
+        due = [(monotonic(), name) for name in names]  # Heap of (time, name)
+        snapshots = {}
+        tokens = self.requests_per_minute  # Start with a full budget
+        refilled = monotonic()
+
+        while due and not self._stop.is_set():
+            when, name = heappop(due)
+
+            if self._stop.wait(max(0, when - monotonic())):
+                break
+
+            # Take this refresh's requests from the budget, waiting for it to
+            # refill if needed
+            now = monotonic()
+            tokens = min(self.requests_per_minute,
+                         tokens + (now - refilled) * self.requests_per_minute
+                         / 60)
+            refilled = now
+            shortfall = self.REQUESTS_PER_REFRESH - tokens
+
+            if shortfall > 0:
+                wait = shortfall * 60 / self.requests_per_minute
+                if self._stop.wait(wait):
+                    break
+                tokens, refilled = self.REQUESTS_PER_REFRESH, monotonic()
+
+            tokens -= self.REQUESTS_PER_REFRESH
+            mailing_list = self.sympa.lists[name]
+
+            try:
+                mailing_list.update(force=True)
+            except Exception as err:
+                print("Could not refresh list '{}': {}".format(name, err),
+                      file=stderr)
+                heappush(due, (monotonic() + self.max_interval, name))
+                continue
+
+            if not mailing_list._admin:  # Nothing to watch on this list
+                continue
+
+            snapshot = self.__snapshot(mailing_list)
+            changed = False
+
+            if name in snapshots:
+                for event in self.__diff(name, snapshots[name], snapshot,
+                                         mailing_list):
+                    changed = True
+                    yield (event)
+
+            snapshots[name] = snapshot
+            interval = self.intervals.get(name, self.min_interval)
+
+            if changed:
+                interval = max(self.min_interval, interval * self.SPEEDUP)
+            elif name in self.intervals:
+                interval = min(self.max_interval, interval * self.SLOWDOWN)
+
+            self.intervals[name] = interval
+            heappush(due, (monotonic() + interval, name))
+
+    async def __aiter__(self):
+        # Run the blocking generator in a worker thread, one event at a time
+        loop = get_running_loop()
+        events = iter(self)
+
+        while True:
+            event = await loop.run_in_executor(None, next, events, None)
+
+            if event is None:
+                break
+
+            yield (event)
+
+    def stop(self):
+        """
+        Stop watching; iteration ends once the current refresh is done
+        :return:
+        """
+        self._stop.set()
+
+    def __snapshot(self, mailing_list):
+        # The watched attributes of each subscriber of a list
+        return ({email: tuple(getattr(s, x, None) for x, kind in self.WATCHED)
+                 for email, s in list(mailing_list._subscribers.items())})
+
+    def __diff(self, name, old, new, mailing_list):
+        # Generate the change events between two snapshots of a list
+        for email in new.keys() - old.keys():
+            subscriber = mailing_list._subscribers.get(email)
+            yield (ChangeEvent(self.ADDED, name, email, subscriber, {}))
+
+        for email in old.keys() - new.keys():
+            yield (ChangeEvent(self.REMOVED, name, email, None, {}))
+
+        for email in new.keys() & old.keys():
+            if old[email] == new[email]:
+                continue
+
+            for kind in [self.UPDATED, self.BOUNCE_CHANGED]:
+                changes = {x: (o, n) for (x, k), o, n in
+                           zip(self.WATCHED, old[email], new[email])
+                           if k == kind and o != n}
+
+                if changes:
+                    subscriber = mailing_list._subscribers.get(email)
+                    yield (ChangeEvent(kind, name, email, subscriber, changes))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+from sys import stderr
+from threading import Lock
+from threading import Timer
+
+from Sympal.Deadline import Deadline
+
+
+class BatchFlushError(Exception):
+    def __init__(self, errors):
+        """
+        Raised when sending the batches of several lists failed for some
+        :param errors: dict<str, Exception>: list name: the error sending it
+        """
+        super().__init__("Sending batches failed for lists: {}".format(
+            ", ".join(sorted(errors))))
+        self.errors = errors
+
+
+class WriteBatch:
+    def __init__(self, mailing_list, max_size=100, max_delay=None,
+                 journal=None, deadline=None):
+        """
+        Buffers the add_subscriber and remove_subscriber calls made on a list
+        by the thread using it as a context manager, then sends them as a few
+        consolidated requests followed by a single refresh
+            with mailing_list.batch():
+                for email in joined:
+                    mailing_list.add_subscriber(email)
+        Only the last call for each address is kept, so adding and then
+        removing an address cancels out. Calls are sent on exit, or sooner
+        once max_size addresses are buffered, or max_delay seconds after the
+        first buffered call. If the with block raises, calls not yet sent
+        are discarded
+        :param mailing_list: MailingList: the list
+        :param max_size: int: send once this many addresses are buffered
+        :param max_delay: float: send this many seconds after the first
+        buffered call, or only on size and exit if None
+        :param journal: str or OperationJournal: record each send here, so
+        that it can be resumed if interrupted
+        :param deadline: float or Deadline: seconds allowed for the batch,
+        sends included
+        """
+        self.mailing_list = mailing_list
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.journal = journal
+        self.deadline = Deadline.of(deadline)
+        self.results = []  # BulkResult of each send
+        # normalized email: (email, real name) to add, or None to remove
+        self._pending = {}
+        self._lock = Lock()  # Guards _pending, _timer and _depth
+        self._send_lock = Lock()  # Sends happen one at a time
+        self._timer = None
+        self._depth = 0  # Nesting of with blocks using this batch
+
+    def __enter__(self):
+        with self._lock:
+            self._depth += 1
+            self.mailing_list._open_batch.batch = self  # For this thread
+
+        return (self)
+
+    def __exit__(self, ex_type, ex_val, traceback):
+        with self._lock:
+            self._depth -= 1
+            outermost = not self._depth
+
+            if outermost:  # Calls from now on are sent immediately
+                self.mailing_list._open_batch.batch = None
+
+        if not outermost:
+            return
+
+        if ex_type is None:
+            self.flush()
+        else:  # The calls were cut short, do not send a partial batch
+            self.discard()
+
+    def discard(self):
+        """
+        Drop the buffered calls without sending them
+        :return:
+        """
+        with self._lock:
+            self._pending = {}
+
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def __len__(self):
+        return (len(self._pending))
+
+    def add(self, email, real_name=""):
+        """
+        Buffer adding a subscriber
+        :param email: str: the email address, sent as given
+        :param real_name: str: the real name of the person being added
+        :return:
+        """
+        self.__buffer(email, (email, real_name or ""))
+
+    def remove(self, email):
+        """
+        Buffer removing a subscriber
+        :param email: str: the email address
+        :return:
+        """
+        self.__buffer(email, None)
+
+    def __buffer(self, email, add):
+        # Keep only the last call for the address (compared in its canonical
+        # form), then send if the batch is full, or start the timer for the
+        # first call since the last send
+        key = self.mailing_list.normalizer.normalize(email)
+
+        with self._lock:
+            self._pending.pop(key, None)  # Keep calls in order of arrival
+            self._pending[key] = add
+            full = len(self._pending) >= self.max_size
+
+            if not full and self.max_delay is not None and not self._timer:
+                self._timer = Timer(self.max_delay, self.__timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if full:
+            self.flush()
+
+    def __timed_flush(self):
+        # Send from the timer thread, where nobody could catch an error
+        try:
+            self.flush()
+        except Exception as err:
+            print("Batch for list '{}' failed: {}".format(
+                self.mailing_list.name, err), file=stderr)
+
+    def flush(self):
+        """
+        Send the buffered calls now
+        :return: BulkResult: the requests accepted, and any remaining, or None
+        if nothing was buffered, or the user is not an administrator of the
+        list
+        """
+        with self._send_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+
+            if not pending:
+                return (None)
+
+            try:
+                result = self.mailing_list._send_batch(pending, self.journal,
+                                                       self.deadline)
+            except Exception:
+                with self._lock:  # Keep the calls for the next send
+                    pending.update(self._pending)
+                    self._pending = pending
+                raise
+
+            if result is not None:
+                self.results += [result]
+
+            return (result)